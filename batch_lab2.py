@@ -0,0 +1,372 @@
+"""
+Пакетная обработка каталога рецептом лабораторной 2 (без PyQt5).
+
+Рецепт -- сохраненная цепочка шагов морфологии и резкости (JSON,
+см. save_recipe; вкладка морфологии сохраняет свою цепочку так же).
+Дерево каталога обходится целиком, структура повторяется в выходном
+каталоге.
+
+Файлы раздаются пакетами по процессам, а внутри процесса идет конвейер
+из трех потоков: чтение и декодирование, обработка, кодирование и
+запись. cv2 отпускает GIL, поэтому декодирование следующего файла и
+запись предыдущего идут одновременно с обработкой текущего.
+
+Ключ результата -- хеш рецепта и байтов исходного файла. Ключи хранятся
+в манифесте выходного каталога; файл, чей ключ не изменился, а результат
+на месте, повторно не декодируется и не обрабатывается.
+
+Примеры:
+    python batch_lab2.py photos/ out/ erode:rect:5:2 sharpen:log:5 --save-recipe recipe.json
+    python batch_lab2.py photos/ out/ --recipe recipe.json -w 4 --ext .png
+"""
+import argparse
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from morph_pipeline import Step
+from tiled_ops import Sharpen, parse_tiled_step
+
+RECIPE_VERSION = 1
+MANIFEST = '.lab2_batch.json'
+# Расширения, которые читает cv2.imread
+EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp', '.ppm', '.pgm', '.pnm')
+STAGES = ('read', 'decode', 'process', 'encode', 'write')
+STAGE_TITLES = {
+    'read': 'чтение и хеш',
+    'decode': 'декодирование',
+    'process': 'обработка',
+    'encode': 'кодирование',
+    'write': 'запись',
+}
+
+# Файл задания: пути и ключ из манифеста (None -- результата нет)
+Job = namedtuple('Job', 'src dst rel known')
+
+
+# Рецепт
+
+def recipe_to_json(steps):
+    """Шаги Step / Sharpen -> словарь рецепта."""
+    items = []
+    for step in steps:
+        if isinstance(step, Sharpen):
+            items.append(dict(op='sharpen', **step._asdict()))
+        else:
+            items.append(step._asdict())
+    return {'version': RECIPE_VERSION, 'steps': items}
+
+
+def recipe_from_json(recipe):
+    """Словарь рецепта -> список шагов; строки 'op:shape:size[:iter]' тоже допускаются."""
+    if recipe.get('version') != RECIPE_VERSION:
+        raise ValueError('неподдерживаемая версия рецепта: %r' % recipe.get('version'))
+    steps = []
+    for item in recipe.get('steps', []):
+        if isinstance(item, str):
+            steps.append(parse_tiled_step(item))
+            continue
+        item = dict(item)
+        op = item.pop('op', None)
+        try:
+            steps.append(Sharpen(**item) if op == 'sharpen' else Step(op, **item))
+        except TypeError as e:
+            raise ValueError('неверный шаг рецепта %r: %s' % (item, e))
+    if not steps:
+        raise ValueError('рецепт не содержит шагов')
+    return steps
+
+
+def save_recipe(path, steps):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(recipe_to_json(steps), f, indent=2, ensure_ascii=False)
+
+
+def load_recipe(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return recipe_from_json(json.load(f))
+
+
+def recipe_key(steps, ext):
+    """Хеш рецепта и формата вывода: входит в ключ каждого результата."""
+    text = json.dumps([recipe_to_json(steps), ext], sort_keys=True)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+# Манифест
+
+def read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != RECIPE_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+
+def write_manifest(out_dir, files):
+    path = os.path.join(out_dir, MANIFEST)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': RECIPE_VERSION, 'files': files}, f, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# Обход каталога
+
+def find_jobs(in_dir, out_dir, ext=None, manifest=None):
+    """Задания для всех изображений дерева in_dir (выходной каталог пропускается)."""
+    manifest = manifest or {}
+    skip = os.path.realpath(out_dir)
+    jobs = []
+    for root, dirs, files in os.walk(in_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.realpath(os.path.join(root, d)) != skip)
+        for name in sorted(files):
+            base, src_ext = os.path.splitext(name)
+            if src_ext.lower() not in EXTENSIONS:
+                continue
+            rel = os.path.relpath(os.path.join(root, base + (ext or src_ext)), in_dir)
+            rel = rel.replace(os.sep, '/')
+            jobs.append(Job(os.path.join(root, name), os.path.join(out_dir, rel), rel,
+                            manifest.get(rel)))
+    return jobs
+
+
+# Конвейер внутри процесса
+
+_DONE = None
+
+
+def _read_stage(jobs, key_prefix, out):
+    """Поток 1: чтение, хеш, проверка актуальности, декодирование."""
+    for job in jobs:
+        result = {'path': job.rel, 'status': 'ok', 'times': {}, 'pixels': 0}
+        image = None
+        try:
+            start = time.perf_counter()
+            with open(job.src, 'rb') as f:
+                data = f.read()
+            digest = hashlib.blake2b(key_prefix, digest_size=16)
+            digest.update(data)
+            key = result['key'] = digest.hexdigest()
+            mid = time.perf_counter()
+            result['times']['read'] = mid - start
+            known = job.known
+            if (known is not None and known.get('key') == key and os.path.exists(job.dst)
+                    and os.path.getsize(job.dst) == known.get('size')):
+                result['status'] = 'skipped'
+                result['size'] = known['size']
+            else:
+                image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    raise ValueError('не удалось декодировать')
+                result['times']['decode'] = time.perf_counter() - mid
+                result['pixels'] = image.shape[0] * image.shape[1]
+        except Exception as e:  # ошибка одного файла не останавливает пакет
+            result['status'] = 'error'
+            result['error'] = str(e)
+        out.put((job, result, image))
+    out.put(_DONE)
+
+
+def _write_stage(source, results):
+    """Поток 3: кодирование и атомарная запись результата."""
+    while True:
+        item = source.get()
+        if item is _DONE:
+            return
+        job, result, image = item
+        if image is not None:
+            try:
+                start = time.perf_counter()
+                ok, encoded = cv2.imencode(os.path.splitext(job.dst)[1], image)
+                if not ok:
+                    raise ValueError('не удалось закодировать')
+                mid = time.perf_counter()
+                os.makedirs(os.path.dirname(job.dst) or '.', exist_ok=True)
+                tmp = job.dst + '.tmp'
+                with open(tmp, 'wb') as f:
+                    f.write(encoded)
+                os.replace(tmp, job.dst)
+                result['times']['encode'] = mid - start
+                result['times']['write'] = time.perf_counter() - mid
+                result['size'] = len(encoded)
+            except Exception as e:
+                result['status'] = 'error'
+                result['error'] = str(e)
+        results.append(result)
+
+
+def process_batch(jobs, steps, key_prefix, depth=2):
+    """
+    Обрабатывает jobs конвейером «чтение -> обработка -> запись» и
+    возвращает по словарю результата на файл. depth -- сколько файлов
+    может ждать между соседними стадиями (ограничивает память).
+    """
+    decoded = queue.Queue(depth)
+    processed = queue.Queue(depth)
+    results = []
+    reader = threading.Thread(target=_read_stage, args=(jobs, key_prefix, decoded), daemon=True)
+    writer = threading.Thread(target=_write_stage, args=(processed, results), daemon=True)
+    reader.start()
+    writer.start()
+    while True:
+        item = decoded.get()
+        if item is _DONE:
+            break
+        job, result, image = item
+        if image is not None:
+            try:
+                start = time.perf_counter()
+                for step in steps:
+                    image = step.apply(image)
+                result['times']['process'] = time.perf_counter() - start
+            except Exception as e:
+                result['status'] = 'error'
+                result['error'] = str(e)
+                image = None
+        processed.put((job, result, image))
+    processed.put(_DONE)
+    reader.join()
+    writer.join()
+    return results
+
+
+def _init_worker():
+    # Параллельность дают процессы; потоки cv2 внутри каждого только мешали бы
+    cv2.setNumThreads(1)
+
+
+def run_batch(in_dir, out_dir, steps, ext=None, workers=None, batch=8, force=False,
+              progress=None):
+    """
+    Обрабатывает дерево in_dir рецептом steps; возвращает список
+    результатов и время работы. С force=True манифест не учитывается.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {} if force else read_manifest(out_dir)
+    jobs = find_jobs(in_dir, out_dir, ext, manifest)
+    key_prefix = recipe_key(steps, ext)
+    batches = [jobs[i:i + batch] for i in range(0, len(jobs), batch)]
+    results = []
+
+    def collect(batch_results):
+        for result in batch_results:
+            results.append(result)
+            if result['status'] == 'error':
+                manifest.pop(result['path'], None)
+            else:
+                manifest[result['path']] = {'key': result['key'], 'size': result['size']}
+        if progress is not None:
+            progress(len(results), len(jobs))
+
+    start = time.perf_counter()
+    try:
+        if workers == 1:
+            for part in batches:
+                collect(process_batch(part, steps, key_prefix))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+                # Не больше 2 пакетов на процесс в очереди, как в colour_cli
+                limit = 2 * (workers or os.cpu_count() or 1)
+                pending = deque()
+                for part in batches:
+                    pending.append(pool.submit(process_batch, part, steps, key_prefix))
+                    if len(pending) >= limit:
+                        collect(pending.popleft().result())
+                while pending:
+                    collect(pending.popleft().result())
+    finally:
+        # Манифест пишется и при прерывании: готовые файлы не будут пересчитаны
+        write_manifest(out_dir, manifest)
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    """Сводка: число файлов по статусам и пропускная способность стадий."""
+    counts = {status: 0 for status in ('ok', 'skipped', 'error')}
+    for r in results:
+        counts[r['status']] += 1
+    stages = {}
+    for stage in STAGES:
+        timed = [r for r in results if stage in r['times']]
+        seconds = sum(r['times'][stage] for r in timed)
+        pixels = sum(r['pixels'] for r in timed)
+        stages[stage] = {
+            'files': len(timed),
+            'seconds': seconds,
+            'files_per_s': len(timed) / seconds if seconds else 0.0,
+            'mpix_per_s': pixels / 1e6 / seconds if seconds and pixels else 0.0,
+        }
+    return {'counts': counts, 'elapsed': elapsed, 'stages': stages,
+            'files_per_s': len(results) / elapsed if elapsed else 0.0}
+
+
+def _print_summary(summary):
+    c = summary['counts']
+    print('обработано %d, пропущено (актуальны) %d, ошибок %d за %.2f с (%.1f файлов/с)' % (
+        c['ok'], c['skipped'], c['error'], summary['elapsed'], summary['files_per_s']))
+    print('%-15s %7s %9s %10s %9s' % ('стадия', 'файлов', 'время, с', 'файлов/с', 'Мпикс/с'))
+    for stage in STAGES:
+        s = summary['stages'][stage]
+        print('%-15s %7d %9.2f %10.1f %9.1f' % (
+            STAGE_TITLES[stage], s['files'], s['seconds'], s['files_per_s'], s['mpix_per_s']))
+    print('время стадий -- суммарное по потокам всех процессов')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Пакетная обработка каталога рецептом лабораторной 2')
+    parser.add_argument('input', help='каталог с изображениями (обходится рекурсивно)')
+    parser.add_argument('output', help='выходной каталог')
+    parser.add_argument('steps', nargs='*',
+                        help='шаги op:shape:size[:iterations] или sharpen:method:ksize')
+    parser.add_argument('-r', '--recipe', help='файл рецепта JSON (вместо шагов)')
+    parser.add_argument('--save-recipe', help='сохранить шаги в файл рецепта')
+    parser.add_argument('--ext', default=None, help='формат результата, например .png '
+                                                    '(по умолчанию как у исходного файла)')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='число процессов (по умолчанию по числу ядер, 1 - без пула)')
+    parser.add_argument('--batch', type=int, default=8, help='файлов в пакете процесса')
+    parser.add_argument('--force', action='store_true', help='пересчитать все файлы')
+    parser.add_argument('-o', '--report', help='файл JSON со сводкой')
+    args = parser.parse_args(argv)
+
+    if bool(args.steps) == bool(args.recipe):
+        parser.error('укажите шаги или --recipe')
+    try:
+        steps = load_recipe(args.recipe) if args.recipe else [parse_tiled_step(s) for s in args.steps]
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.save_recipe:
+        save_recipe(args.save_recipe, steps)
+    ext = args.ext if args.ext is None or args.ext.startswith('.') else '.' + args.ext
+
+    results, elapsed = run_batch(
+        args.input, args.output, steps, ext, args.workers, max(1, args.batch), args.force,
+        progress=lambda done, total: print('\r%d/%d' % (done, total), end='', file=sys.stderr,
+                                           flush=True))
+    print(file=sys.stderr)
+    for r in results:
+        if r['status'] == 'error':
+            print('%s: ошибка: %s' % (r['path'], r['error']), file=sys.stderr)
+    summary = summarize(results, elapsed)
+    _print_summary(summary)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+    return 1 if summary['counts']['error'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Бенчмарк и проверка точности преобразований лабораторной 1.
+
+Измеряет пропускную способность rgb_to_cmyk, cmyk_to_rgb, rgb_to_hsv_vals
+и hsv_to_rgb_vals в скалярном, пакетном, целочисленном и LUT-вариантах
+на случайных входах (и на всем кубе RGB с --exhaustive), считает ошибку
+преобразований туда и обратно и сохраняет результаты в JSON. С --compare
+результаты сравниваются с сохраненным ранее прогоном.
+
+Примеры:
+    python bench_lab1.py -o bench.json
+    python bench_lab1.py --exhaustive --lut-dir /tmp/lut --compare bench.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from colour_engine import (rgb_to_cmyk_batch, cmyk_to_rgb_batch,
+                           rgb_to_hsv_batch, hsv_to_rgb_batch)
+from colour_fixed import (rgb_to_cmyk_int_batch, hsv_to_rgb_int_batch,
+                          to_hundredths)
+
+
+def _scalar_functions():
+    # lab1 тянет tkinter, поэтому импортируется только для скалярного пути
+    from lab1 import rgb_to_cmyk, cmyk_to_rgb, rgb_to_hsv_vals, hsv_to_rgb_vals
+    return {
+        'rgb_to_cmyk': rgb_to_cmyk,
+        'cmyk_to_rgb': cmyk_to_rgb,
+        'rgb_to_hsv_vals': rgb_to_hsv_vals,
+        'hsv_to_rgb_vals': hsv_to_rgb_vals,
+    }
+
+
+def _best_time(func, arg, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _full_cube():
+    """Все 256**3 цветов RGB в виде массива uint8 (N, 3)."""
+    idx = np.arange(256 ** 3, dtype=np.uint32)
+    cube = np.empty((idx.size, 3), dtype=np.uint8)
+    cube[:, 0] = idx >> 16
+    cube[:, 1] = (idx >> 8) & 0xFF
+    cube[:, 2] = idx & 0xFF
+    return cube
+
+
+def _inputs(rng, n, exhaustive):
+    """Наборы входов: {имя набора: (rgb, cmyk, hsv)}."""
+    rgb = rng.integers(0, 256, (n, 3), dtype=np.uint8)
+    sets = {
+        'random': (rgb,
+                   np.round(rng.uniform(0, 100, (n, 4)), 2),
+                   np.round(np.column_stack([rng.uniform(0, 360, n),
+                                             rng.uniform(0, 100, (n, 2))]), 2)),
+    }
+    if exhaustive:
+        # Обратные преобразования проверяются на образах всего куба
+        cube = _full_cube()
+        sets['exhaustive'] = (cube, rgb_to_cmyk_batch(cube), rgb_to_hsv_batch(cube))
+    return sets
+
+
+def run_benchmarks(n, scalar_n, exhaustive, repeat, lut=None, seed=0):
+    rng = np.random.default_rng(seed)
+    scalar = _scalar_functions()
+    results = []
+
+    def record(func, path, input_name, count, seconds):
+        results.append({
+            'func': func, 'path': path, 'input': input_name, 'n': int(count),
+            'seconds': seconds, 'mcolours_per_s': count / seconds / 1e6,
+        })
+
+    for input_name, (rgb, cmyk, hsv) in _inputs(rng, n, exhaustive).items():
+        batch = [
+            ('rgb_to_cmyk', 'batch', rgb_to_cmyk_batch, rgb),
+            ('cmyk_to_rgb', 'batch', cmyk_to_rgb_batch, cmyk),
+            ('rgb_to_hsv_vals', 'batch', rgb_to_hsv_batch, rgb),
+            ('hsv_to_rgb_vals', 'batch', hsv_to_rgb_batch, hsv),
+            ('rgb_to_cmyk', 'int', rgb_to_cmyk_int_batch, rgb),
+            ('hsv_to_rgb_vals', 'int', hsv_to_rgb_int_batch, to_hundredths(hsv)),
+        ]
+        if lut is not None:
+            batch += [
+                ('rgb_to_cmyk', 'lut', lut.rgb_to_cmyk, rgb),
+                ('rgb_to_hsv_vals', 'lut', lut.rgb_to_hsv, rgb),
+            ]
+        for func, path, convert, arg in batch:
+            record(func, path, input_name, len(arg), _best_time(convert, arg, repeat))
+
+        if input_name == 'random':
+            # Скалярный путь слишком медленный для всего куба
+            for func, arg in (('rgb_to_cmyk', rgb), ('cmyk_to_rgb', cmyk),
+                              ('rgb_to_hsv_vals', rgb), ('hsv_to_rgb_vals', hsv)):
+                rows = arg[:scalar_n].tolist()
+                f = scalar[func]
+                start = time.perf_counter()
+                for row in rows:
+                    f(*row)
+                record(func, 'scalar', input_name, len(rows), time.perf_counter() - start)
+    return results
+
+
+def roundtrip_errors(rgb):
+    """Ошибки RGB -> CMYK -> RGB и RGB -> HSV -> RGB в единицах 0..255."""
+    report = {}
+    for name, forward, backward in (('cmyk', rgb_to_cmyk_batch, cmyk_to_rgb_batch),
+                                    ('hsv', rgb_to_hsv_batch, hsv_to_rgb_batch)):
+        back = backward(forward(rgb))
+        err = np.abs(back.astype(np.int16) - rgb.astype(np.int16))
+        report['rgb_%s_rgb' % name] = {
+            'n': int(len(rgb)),
+            'max_abs_error': int(err.max()),
+            'mean_abs_error': float(err.mean()),
+            'mismatched_colours': int(np.count_nonzero(err.any(axis=-1))),
+        }
+    return report
+
+
+def compare(results, baseline_path, tolerance):
+    """Печатает отношение скоростей к прошлому прогону; возвращает число регрессий."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    old = {(r['func'], r['path'], r['input']): r for r in baseline['results']}
+    regressions = 0
+    print('\nСравнение с %s (допуск %.0f %%):' % (baseline_path, tolerance * 100))
+    for r in results:
+        prev = old.get((r['func'], r['path'], r['input']))
+        if prev is None:
+            continue
+        ratio = r['mcolours_per_s'] / prev['mcolours_per_s']
+        mark = ''
+        if ratio < 1 - tolerance:
+            mark = '  РЕГРЕССИЯ'
+            regressions += 1
+        print('  %-16s %-7s %-11s %6.2fx%s' % (r['func'], r['path'], r['input'], ratio, mark))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк преобразований лабораторной 1')
+    parser.add_argument('-n', type=int, default=1_000_000, help='размер случайного пакета')
+    parser.add_argument('--scalar-n', type=int, default=20_000, help='число скалярных вызовов')
+    parser.add_argument('--exhaustive', action='store_true', help='прогон на всем кубе RGB')
+    parser.add_argument('--repeat', type=int, default=3, help='повторов пакетного замера (берется лучший)')
+    parser.add_argument('--lut-dir', default=None, help='каталог построенной LUT (colour_lut)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='файл JSON с результатами')
+    parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='допустимое замедление при сравнении (доля)')
+    args = parser.parse_args()
+
+    lut = None
+    if args.lut_dir is not None:
+        from colour_lut import load_lut
+        try:
+            lut = load_lut(args.lut_dir, build=False)
+        except RuntimeError as e:
+            parser.error('LUT недоступна (%s). Постройте таблицу: python colour_lut.py --dir %s'
+                         % (e, args.lut_dir))
+
+    results = run_benchmarks(args.n, args.scalar_n, args.exhaustive, args.repeat, lut, args.seed)
+    rgb = _full_cube() if args.exhaustive else np.random.default_rng(args.seed).integers(
+        0, 256, (args.n, 3), dtype=np.uint8)
+    roundtrip = roundtrip_errors(rgb)
+
+    print('%-16s %-7s %-11s %10s %12s' % ('функция', 'путь', 'вход', 'цветов', 'Мцв/с'))
+    for r in results:
+        print('%-16s %-7s %-11s %10d %12.3f' % (r['func'], r['path'], r['input'],
+                                                 r['n'], r['mcolours_per_s']))
+    print('\nОшибка туда и обратно:')
+    for name, rep in roundtrip.items():
+        print('  %-12s max %d, mean %.4f, несовпадений %d из %d' % (
+            name, rep['max_abs_error'], rep['mean_abs_error'],
+            rep['mismatched_colours'], rep['n']))
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'n': args.n, 'scalar_n': args.scalar_n, 'seed': args.seed,
+            'exhaustive': args.exhaustive, 'lut': lut is not None,
+        },
+        'results': results,
+        'roundtrip': roundtrip,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
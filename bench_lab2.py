@@ -0,0 +1,288 @@
+"""
+Бенчмарк операций лабораторной 2.
+
+Повышение резкости: эталон sharpen() (float64) против быстрых путей
+FastSharpener (float32 и int16) -- время, пропускная способность, память
+(пик временных массивов по tracemalloc, который видит выделения numpy и
+cv2, плюс постоянные буферы и выходной массив) и отклонение от эталона.
+
+Морфология (--morph): прямые вызовы cv2, как раньше во вкладке, против
+image_ops.morphology со свертыванием итераций и ван Херком; результаты
+обязаны совпадать бит в бит. С --binary кадр бинаризуется, и сравнивается
+упакованный путь (упаковка, операция и распаковка входят во время).
+
+Импорт (--imports): время импорта модулей лабораторной в отдельном
+интерпретаторе (медиана, по -X importtime) и загружается ли при этом Qt.
+
+Масштабирование (--scaling): время шагов в режимах parallel_ops ('cv2' --
+cv2.setNumThreads, 'strips' -- полосы в пуле потоков) при разном числе
+потоков, ускорение относительно одного потока и совпадение с целым кадром.
+
+Примеры:
+    python bench_lab2.py --size 4000x3000
+    python bench_lab2.py images/1.jpg --methods log --ksizes 3,5 -o bench2.json
+    python bench_lab2.py --morph
+    python bench_lab2.py --morph --binary
+    python bench_lab2.py --imports
+    python bench_lab2.py --scaling --threads 1,2,4,8
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from image_ops import (SHAPES, SHARPEN_METHODS, FastSharpener, PackedMask, binary_morphology,
+                       morphology, sharpen)
+
+# Конфигурации морфологии: (операция, форма, размер, итерации)
+MORPH_CASES = [
+    ('erode', 'rect', 3, 1), ('erode', 'rect', 31, 1), ('erode', 'rect', 31, 3),
+    ('erode', 'rect', 31, 10), ('dilate', 'rect', 15, 10), ('open', 'rect', 31, 1),
+    ('erode', 'ellipse', 31, 1), ('erode', 'cross', 31, 3),
+]
+
+# Шаги для --scaling
+SCALING_STEPS = ('erode:rect:5', 'erode:ellipse:15', 'open:rect:31', 'sharpen:laplacian:3',
+                 'sharpen:log:5')
+
+# Модули для --imports: фасад без Qt, окно и консольные утилиты
+IMPORT_MODULES = ('lab2', 'lab2_gui', 'image_ops', 'morph_pipeline', 'tiled_ops',
+                  'batch_lab2', 'video_ops')
+
+
+def _load(path, size, seed):
+    import cv2
+    if path is not None:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError('не удалось прочитать изображение: %s' % path)
+        if size is not None:
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        return image
+    # Синтетический кадр: гладкий фон с шумом и резкими краями
+    w, h = size or (4000, 3000)
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (h // 16 + 1, w // 16 + 1, 3), dtype=np.uint8)
+    image = cv2.resize(small, (w, h), interpolation=cv2.INTER_NEAREST)
+    noise = rng.integers(-8, 9, image.shape, dtype=np.int16)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def _measure(func, repeat):
+    """Лучшее время из repeat прогонов и пиковая память одного прогона, байт."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    del result
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def run_sharpen_benchmarks(image, methods, ksizes, repeat):
+    results = []
+    mpix = image.shape[0] * image.shape[1] / 1e6
+    for method in methods:
+        for ksize in ksizes:
+            seconds, peak, reference = _measure(lambda: sharpen(image, method, ksize), repeat)
+            rows = [('float64', seconds, peak, reference)]
+            for precision in ('float32', 'int16'):
+                sharpener = FastSharpener(precision)
+                out = np.empty_like(image)
+                sharpener(image, method, ksize, out=out)  # буферы выделяются один раз
+                seconds, peak, result = _measure(
+                    lambda: sharpener(image, method, ksize, out=out), repeat)
+                rows.append((precision, seconds, peak + sharpener.nbytes + out.nbytes, result))
+            for precision, seconds, peak, result in rows:
+                diff = np.abs(result.astype(np.int16) - reference)
+                results.append({
+                    'method': method, 'ksize': ksize, 'precision': precision,
+                    'seconds': seconds, 'mpix_per_s': mpix / seconds,
+                    'memory_mb': peak / (1 << 20),
+                    'max_deviation': int(diff.max()),
+                    'deviating_pixels': float(np.count_nonzero(diff) / diff.size),
+                })
+    return results
+
+
+def _cv2_morphology(image, op, shape, size, iterations):
+    """Прежний путь вкладки: ядро строится заново, итерации -- внутри cv2."""
+    import cv2
+    kernel = cv2.getStructuringElement(SHAPES[shape], (size, size))
+    if op == 'erode':
+        return cv2.erode(image, kernel, iterations=iterations)
+    if op == 'dilate':
+        return cv2.dilate(image, kernel, iterations=iterations)
+    ex = {'open': cv2.MORPH_OPEN, 'close': cv2.MORPH_CLOSE, 'gradient': cv2.MORPH_GRADIENT}
+    return cv2.morphologyEx(image, ex[op], kernel)
+
+
+def _packed_morphology(image, op, shape, size, iterations):
+    mask = PackedMask.from_image(image)
+    return binary_morphology(mask, op, shape, size, iterations).to_image()
+
+
+def run_morph_benchmarks(image, repeat, binary=False):
+    results = []
+    fast = _packed_morphology if binary else morphology
+    for op, shape, size, iterations in MORPH_CASES:
+        timings = {}
+        outputs = {}
+        for name, func in (('cv2', _cv2_morphology), ('image_ops', fast)):
+            timings[name], _, outputs[name] = _measure(
+                lambda: func(image, op, shape, size, iterations), repeat)
+        results.append({
+            'op': op, 'shape': shape, 'size': size, 'iterations': iterations,
+            'cv2_seconds': timings['cv2'], 'seconds': timings['image_ops'],
+            'identical': bool(np.array_equal(outputs['cv2'], outputs['image_ops'])),
+        })
+    return results
+
+
+def run_scaling_benchmarks(image, texts, thread_counts, repeat):
+    from parallel_ops import EXEC_MODES, EXECUTION
+    from tiled_ops import parse_tiled_step
+    results = []
+    try:
+        for text in texts:
+            step = parse_tiled_step(text)
+            EXECUTION.configure('cv2', 1)
+            reference = step.apply(image)
+            for mode in EXEC_MODES:
+                base = None
+                for threads in thread_counts:
+                    EXECUTION.configure(mode, threads)
+                    seconds, _, result = _measure(lambda: EXECUTION.apply(step, image), repeat)
+                    base = base or seconds
+                    results.append({
+                        'step': text, 'mode': mode, 'threads': threads, 'seconds': seconds,
+                        'speedup': base / seconds,
+                        'identical': bool(np.array_equal(result, reference)),
+                    })
+    finally:
+        EXECUTION.configure('cv2', None)
+    return results
+
+
+def _import_time(module):
+    """Время импорта module в новом интерпретаторе, мс, и загружен ли PyQt5."""
+    code = 'import sys, %s; print(int("PyQt5" in sys.modules))' % module
+    # С -c первым в sys.path идет рабочий каталог: запускаем из каталога модулей
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=os.path.dirname(os.path.abspath(__file__)),
+                          capture_output=True, text=True, check=True)
+    # Последняя строка -importtime -- сам модуль, столбец cumulative в мкс
+    line = [l for l in proc.stderr.splitlines() if l.rstrip().endswith(' ' + module)][-1]
+    return int(line.split('|')[1]) / 1000, bool(int(proc.stdout))
+
+
+def run_import_benchmarks(repeat):
+    results = []
+    for module in IMPORT_MODULES:
+        samples = [_import_time(module) for _ in range(repeat)]
+        results.append({
+            'module': module,
+            'ms': statistics.median(ms for ms, _ in samples),
+            'qt': samples[0][1],
+        })
+    return results
+
+
+def _print_sharpen(results):
+    print('%-10s %5s %-8s %9s %9s %11s %6s %10s' % (
+        'метод', 'ksize', 'точность', 'мс', 'Мпикс/с', 'память, МБ', 'откл.', 'пикселей'))
+    for r in results:
+        print('%-10s %5d %-8s %9.1f %9.1f %11.1f %6d %9.2f%%' % (
+            r['method'], r['ksize'], r['precision'], r['seconds'] * 1000, r['mpix_per_s'],
+            r['memory_mb'], r['max_deviation'], r['deviating_pixels'] * 100))
+
+
+def _print_morph(results):
+    print('%-8s %-8s %5s %5s %9s %11s %8s %10s' % (
+        'операция', 'форма', 'ядро', 'итер', 'cv2, мс', 'image_ops', 'ускор.', 'совпадает'))
+    for r in results:
+        print('%-8s %-8s %5d %5d %9.1f %11.1f %7.2fx %10s' % (
+            r['op'], r['shape'], r['size'], r['iterations'], r['cv2_seconds'] * 1000,
+            r['seconds'] * 1000, r['cv2_seconds'] / r['seconds'], 'да' if r['identical'] else 'НЕТ'))
+
+
+def _print_scaling(results):
+    print('%-20s %-7s %7s %9s %8s %10s' % ('шаг', 'режим', 'потоков', 'мс', 'ускор.', 'совпадает'))
+    for r in results:
+        print('%-20s %-7s %7d %9.1f %7.2fx %10s' % (
+            r['step'], r['mode'], r['threads'], r['seconds'] * 1000, r['speedup'],
+            'да' if r['identical'] else 'НЕТ'))
+
+
+def _print_imports(results):
+    print('%-16s %9s %5s' % ('модуль', 'мс', 'Qt'))
+    for r in results:
+        print('%-16s %9.1f %5s' % (r['module'], r['ms'], 'да' if r['qt'] else 'нет'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк операций лабораторной 2')
+    parser.add_argument('image', nargs='?', help='изображение (по умолчанию синтетическое)')
+    parser.add_argument('--size', default=None, help='размер ШxВ (например 4000x3000)')
+    parser.add_argument('--methods', default=','.join(SHARPEN_METHODS))
+    parser.add_argument('--ksizes', default='1,3,5')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--morph', action='store_true', help='морфология вместо резкости')
+    parser.add_argument('--binary', action='store_true',
+                        help='морфология бинарной маски (порог 128) упакованным путем')
+    parser.add_argument('--imports', action='store_true', help='время импорта модулей')
+    parser.add_argument('--scaling', action='store_true',
+                        help='ускорение от числа потоков в режимах cv2 и strips')
+    parser.add_argument('--threads', default=None,
+                        help='число потоков для --scaling через запятую (по умолчанию 1..ядер)')
+    parser.add_argument('-o', '--output', help='файл JSON с результатами')
+    args = parser.parse_args()
+
+    if args.imports:
+        results = run_import_benchmarks(max(args.repeat, 5))
+        _print_imports(results)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({'results': results}, f, indent=2, ensure_ascii=False)
+        return
+
+    size = tuple(int(v) for v in args.size.lower().split('x')) if args.size else None
+    image = _load(args.image, size, args.seed)
+    print('кадр %dx%d' % (image.shape[1], image.shape[0]))
+    if args.scaling:
+        cores = os.cpu_count() or 1
+        counts = ([int(n) for n in args.threads.split(',')] if args.threads
+                  else sorted({n for n in (1, 2, 4, 8, 16, 32) if n < cores} | {cores}))
+        results = run_scaling_benchmarks(image, SCALING_STEPS, counts, args.repeat)
+        _print_scaling(results)
+    elif args.morph:
+        if args.binary:
+            import cv2
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            mask = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)[1]
+            image = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
+        results = run_morph_benchmarks(image, args.repeat, args.binary)
+        _print_morph(results)
+    else:
+        results = run_sharpen_benchmarks(image, args.methods.split(','),
+                                         [int(k) for k in args.ksizes.split(',')], args.repeat)
+        _print_sharpen(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'shape': list(image.shape), 'results': results}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Потоковый конвертер цветов из командной строки (без tkinter).
+
+Читает записи HEX / RGB / CMYK / HSV из stdin или CSV-файлов блоками
+по --chunk-size строк и пишет преобразованные записи по мере готовности,
+поэтому расход памяти не зависит от размера входа. С --workers N блоки
+обрабатываются пулом процессов, порядок записей сохраняется.
+
+Примеры:
+    python colour_cli.py --from hex --to rgb,cmyk < colours.txt
+    python colour_cli.py --from rgb --to hsv --skip-header -w 4 big.csv -o out.csv
+"""
+import argparse
+import itertools
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import colour_engine
+from colour_engine import (rgb_to_cmyk_batch, cmyk_to_rgb_batch,
+                           rgb_to_hsv_batch, hsv_to_rgb_batch)
+
+# Число полей записи в каждой модели
+FIELDS = {'hex': 1, 'rgb': 3, 'cmyk': 4, 'hsv': 3}
+
+
+def _parse_hex(values):
+    """Строки вида #RRGGBB / RRGGBB / #RGB -> массив RGB uint8."""
+    rgb = np.empty((len(values), 3), dtype=np.uint8)
+    for i, value in enumerate(values):
+        h = value.strip().lstrip('#')
+        if len(h) == 3:
+            h = ''.join(ch * 2 for ch in h)
+        if len(h) != 6:
+            raise ValueError('неверный HEX: %r' % value.strip())
+        n = int(h, 16)
+        rgb[i] = (n >> 16, (n >> 8) & 0xFF, n & 0xFF)
+    return rgb
+
+
+def _hex_fields(lines, delimiter, column, first_line):
+    """Поле column каждой строки; строка без него -- ValueError с ее номером."""
+    fields = []
+    for number, line in enumerate(lines, first_line):
+        parts = line.split(delimiter)
+        try:
+            fields.append(parts[column])
+        except IndexError:
+            raise ValueError('строка %d: нет поля %d (полей: %d)' % (number, column, len(parts)))
+    return fields
+
+
+def _decode(lines, source, delimiter, column, first_line=1):
+    """Разбор блока строк в RGB uint8."""
+    width = FIELDS[source]
+    if source == 'hex':
+        return _parse_hex(_hex_fields(lines, delimiter, column, first_line))
+    values = np.loadtxt(lines, delimiter=delimiter, dtype=np.float64, ndmin=2,
+                        usecols=range(column, column + width))
+    if source == 'rgb':
+        if values.size and (values.min() < 0 or values.max() > 255):
+            raise ValueError('компоненты RGB должны быть в диапазоне 0..255')
+        return np.rint(values).astype(np.uint8)
+    if source == 'cmyk':
+        return cmyk_to_rgb_batch(values)
+    return hsv_to_rgb_batch(values)
+
+
+def _encode(rgb, target, delimiter):
+    """RGB uint8 -> список строк в модели target (по одной на запись)."""
+    if target == 'hex':
+        return ['#%02X%02X%02X' % tuple(row) for row in rgb.tolist()]
+    if target == 'rgb':
+        values, fmt = rgb, '%d'
+    elif target == 'cmyk':
+        values, fmt = rgb_to_cmyk_batch(rgb), '%.2f'
+    else:
+        values, fmt = rgb_to_hsv_batch(rgb), '%.2f'
+    row_fmt = delimiter.join([fmt] * values.shape[1])
+    return [row_fmt % tuple(row) for row in values.tolist()]
+
+
+def convert_chunk(lines, source, targets, delimiter=',', column=0, first_line=1):
+    """Преобразует блок строк и возвращает готовый текст блока."""
+    try:
+        rgb = _decode(lines, source, delimiter, column, first_line)
+    except ValueError as e:
+        raise ValueError('строки %d-%d: %s' % (first_line, first_line + len(lines) - 1, e))
+    columns = [_encode(rgb, target, delimiter) for target in targets]
+    return ''.join(delimiter.join(fields) + '\n' for fields in zip(*columns))
+
+
+def _read_chunks(files, chunk_size, skip_header):
+    """Блоки непустых строк из всех входных файлов по очереди."""
+    for f in files:
+        lines = (line for line in f if line.strip())
+        if skip_header:
+            next(lines, None)
+        number = 1 + skip_header
+        while True:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                break
+            yield chunk, number
+            number += len(chunk)
+
+
+def _init_worker(use_lut):
+    if use_lut:
+        colour_engine.enable_lut(build=False)
+
+
+def _parse_targets(value):
+    targets = [t.strip() for t in value.split(',') if t.strip()]
+    for t in targets:
+        if t not in FIELDS:
+            raise argparse.ArgumentTypeError('неизвестная модель: %s' % t)
+    return targets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Потоковое преобразование цветов HEX/RGB/CMYK/HSV')
+    parser.add_argument('inputs', nargs='*', help='CSV-файлы (по умолчанию stdin)')
+    parser.add_argument('--from', dest='source', choices=sorted(FIELDS), required=True,
+                        help='модель входных записей')
+    parser.add_argument('--to', dest='targets', type=_parse_targets, required=True,
+                        help='модели на выходе через запятую, например rgb,cmyk')
+    parser.add_argument('-o', '--output', help='выходной файл (по умолчанию stdout)')
+    parser.add_argument('-d', '--delimiter', default=',', help='разделитель полей')
+    parser.add_argument('--column', type=int, default=0, help='номер первого поля цвета в строке')
+    parser.add_argument('--skip-header', action='store_true', help='пропустить первую строку каждого файла')
+    parser.add_argument('--chunk-size', type=int, default=65536, help='строк в блоке')
+    parser.add_argument('-w', '--workers', type=int, default=0,
+                        help='число процессов (0 - в текущем процессе)')
+    parser.add_argument('--lut', action='store_true',
+                        help='использовать таблицу colour_lut (должна быть построена)')
+    args = parser.parse_args(argv)
+    if args.lut:
+        # Проверяем таблицу до запуска пула: ошибка в процессе-исполнителе
+        # превратилась бы в BrokenProcessPool
+        try:
+            colour_engine.enable_lut(build=False)
+        except RuntimeError as e:
+            parser.error('LUT недоступна (%s). Постройте таблицу: python colour_lut.py' % e)
+
+    files = [open(p, 'r', encoding='utf-8', newline='') for p in args.inputs] or [sys.stdin]
+    out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    chunks = _read_chunks(files, args.chunk_size, args.skip_header)
+    job = (args.source, args.targets, args.delimiter, args.column)
+
+    try:
+        if args.workers > 0:
+            with ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                                     initargs=(args.lut,)) as pool:
+                # Не больше 2 блоков на процесс в работе: память ограничена
+                pending = deque()
+                for lines, number in chunks:
+                    pending.append(pool.submit(convert_chunk, lines, *job, first_line=number))
+                    if len(pending) >= 2 * args.workers:
+                        out.write(pending.popleft().result())
+                while pending:
+                    out.write(pending.popleft().result())
+        else:
+            for lines, number in chunks:
+                out.write(convert_chunk(lines, *job, first_line=number))
+    except ValueError as e:
+        print('ошибка: %s' % e, file=sys.stderr)
+        return 1
+    finally:
+        for f in files:
+            if f is not sys.stdin:
+                f.close()
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,391 @@
+"""
+Векторизованный движок цветовых преобразований для лабораторной 1.
+
+Пространства: rgb (0-255), cmyk (%), hsv и hsl (H: 0-360, остальное 0-100),
+linrgb (линейный RGB 0-1), xyz (D65, Y белого = 100) и lab (CIELAB, D65).
+Преобразования -- ребра графа; convert() строит путь между любыми двумя
+пространствами и выполняет его как одно слитое преобразование: блок
+пикселей проходит все шаги, пока лежит в кэше, без промежуточного
+округления до 8 бит. Округление до точности интерфейса (quantize=True)
+делается один раз на выходе.
+
+Функции *_batch принимают массивы формы (N, 3) / (N, 4) или (H, W, C)
+и возвращают массив той же формы с новым числом каналов. Скалярные
+rgb_to_cmyk, cmyk_to_rgb, rgb_to_hsv и hsv_to_rgb считают одну тройку
+обычной арифметикой float без накладных расходов NumPy. Оба пути
+совпадают бит в бит: повторяется тот же порядок операций с float64, что
+и в colorsys, и то же округление round().
+"""
+import colorsys
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+
+# Размер блока (в пикселях): временные массивы блока помещаются в кэш
+CHUNK = 1 << 16
+
+_SPLIT = 134217729.0  # 2**27 + 1, разбиение Векамп-Деккера
+
+# Таблица поиска из colour_lut (включается через enable_lut)
+_lut = None
+
+
+def enable_lut(directory=None, build=True):
+    """
+    Включает режим LUT: массивы uint8 в rgb_to_cmyk_batch и
+    rgb_to_hsv_batch обслуживаются выборкой из таблицы на диске.
+    """
+    global _lut
+    from colour_lut import load_lut
+    _lut = load_lut(directory, build=build)
+    return _lut
+
+
+def disable_lut():
+    global _lut
+    _lut = None
+
+
+def _lut_for(rgb):
+    """Таблица, если она включена и применима к входу (только uint8)."""
+    if _lut is not None and getattr(rgb, 'dtype', None) == np.uint8:
+        return _lut
+    return None
+
+
+def _round2(x):
+    """
+    Округление до 2 знаков, совпадающее с round(x, 2).
+
+    np.round(x, 2) округляет уже округленное произведение x * 100,
+    а round() работает с точным значением. Ошибку произведения находим
+    без потерь (TwoProduct Деккера) и поправляем только половинные случаи.
+    """
+    p = x * 100.0
+    t = x * _SPLIT
+    hi = t - (t - x)
+    lo = x - hi
+    err = (hi * 100.0 - p) + lo * 100.0
+    q = np.rint(p)
+    d = p - q
+    q += (d == 0.5) & (err > 0)
+    q -= (d == -0.5) & (err < 0)
+    return q / 100.0
+
+
+def _to_byte(x):
+    """int(round(clamp(x, 0, 255))) для массива."""
+    return np.rint(np.clip(x, 0, 255)).astype(np.uint8)
+
+
+# Ребра графа. Каждое принимает каналы (C, n) float64 и возвращает (C', n).
+
+def _rgb_to_cmyk(rgb):
+    r_p, g_p, b_p = rgb / 255.0
+    k = 1 - np.maximum(np.maximum(r_p, g_p), b_p)
+    black = k == 1.0
+    d = 1 - k
+    d[black] = 1.0
+    out = np.empty((4, rgb.shape[1]))
+    for i, comp in enumerate((r_p, g_p, b_p)):
+        out[i] = (1 - comp - k) / d * 100
+        out[i, black] = 0.0
+    out[3] = k * 100
+    out[3, black] = 100.0
+    return out
+
+
+def _cmyk_to_rgb(cmyk):
+    c_p, m_p, y_p, k_p = cmyk / 100.0
+    k_inv = 1 - k_p
+    return np.stack([255 * (1 - comp) * k_inv for comp in (c_p, m_p, y_p)])
+
+
+def _hue(r, g, b, maxc, rangec, grey):
+    """Тон 0..1 так же, как в colorsys (для HSV и HSL)."""
+    safe_range = np.where(grey, 1.0, rangec)
+    rc = (maxc - r) / safe_range
+    gc = (maxc - g) / safe_range
+    bc = (maxc - b) / safe_range
+    h = np.where(r == maxc, bc - gc,
+                 np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = np.mod(h / 6.0, 1.0)
+    h[grey] = 0.0
+    return h
+
+
+def _rgb_to_hsv(rgb):
+    r, g, b = rgb / 255.0
+    maxc = np.maximum(np.maximum(r, g), b)
+    minc = np.minimum(np.minimum(r, g), b)
+    rangec = maxc - minc
+    grey = rangec == 0
+    s = rangec / np.where(grey, 1.0, maxc)
+    s[grey] = 0.0
+    return np.stack((_hue(r, g, b, maxc, rangec, grey) * 360, s * 100, maxc * 100))
+
+
+# Порядок (v, t, p, q) по секторам, как в colorsys.hsv_to_rgb
+_HSV_SECTORS = np.array([
+    (0, 1, 2),
+    (3, 0, 2),
+    (2, 0, 1),
+    (2, 3, 0),
+    (1, 2, 0),
+    (0, 2, 3),
+])
+
+
+def _hsv_to_rgb(hsv):
+    h, s, v = hsv
+    h = np.mod(h, 360) / 360.0
+    s = s / 100.0
+    v = v / 100.0
+    h6 = h * 6.0
+    i = np.trunc(h6)
+    f = h6 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    sector = np.mod(i, 6).astype(np.intp)
+    comps = np.stack((v, t, p, q))
+    rgb = np.take_along_axis(comps, _HSV_SECTORS[sector].T, axis=0)
+    rgb[:, s == 0.0] = v[s == 0.0]
+    return rgb * 255
+
+
+def _rgb_to_hsl(rgb):
+    r, g, b = rgb / 255.0
+    maxc = np.maximum(np.maximum(r, g), b)
+    minc = np.minimum(np.minimum(r, g), b)
+    rangec = maxc - minc
+    grey = rangec == 0
+    l = (maxc + minc) / 2.0
+    den = np.where(l <= 0.5, maxc + minc, 2.0 - maxc - minc)
+    s = rangec / np.where(grey, 1.0, den)
+    s[grey] = 0.0
+    return np.stack((_hue(r, g, b, maxc, rangec, grey) * 360, s * 100, l * 100))
+
+
+def _hsl_to_rgb(hsl):
+    h, s, l = hsl
+    h = np.mod(h, 360) / 30.0
+    s = s / 100.0
+    l = l / 100.0
+    a = s * np.minimum(l, 1 - l)
+    out = np.empty((3, hsl.shape[1]))
+    for i, n in enumerate((0, 8, 4)):
+        k = np.mod(n + h, 12)
+        out[i] = l - a * np.clip(np.minimum(k - 3, 9 - k), -1, 1)
+    return out * 255
+
+
+def _rgb_to_linrgb(rgb):
+    c = rgb / 255.0
+    a = np.abs(c)
+    lin = np.where(a <= 0.04045, a / 12.92, ((a + 0.055) / 1.055) ** 2.4)
+    return np.copysign(lin, c)
+
+
+def _linrgb_to_rgb(lin):
+    a = np.abs(lin)
+    c = np.where(a <= 0.0031308, a * 12.92, 1.055 * a ** (1 / 2.4) - 0.055)
+    return np.copysign(c, lin) * 255
+
+
+# sRGB (D65) -> XYZ, Y белого = 100
+_RGB_TO_XYZ = np.array([
+    [41.24564, 35.75761, 18.04375],
+    [21.26729, 71.51522, 7.21750],
+    [1.93339, 11.91920, 95.03041],
+])
+_XYZ_TO_RGB = np.linalg.inv(_RGB_TO_XYZ)
+# Белая точка -- образ белого sRGB, чтобы белый давал ровно a = b = 0
+_WHITE_D65 = _RGB_TO_XYZ.sum(axis=1)[:, None]
+_LAB_EPS = (6 / 29) ** 3
+
+
+def _linrgb_to_xyz(lin):
+    return _RGB_TO_XYZ @ lin
+
+
+def _xyz_to_linrgb(xyz):
+    return _XYZ_TO_RGB @ xyz
+
+
+def _xyz_to_lab(xyz):
+    t = xyz / _WHITE_D65
+    f = np.where(t > _LAB_EPS, np.cbrt(t), t / (3 * (6 / 29) ** 2) + 4 / 29)
+    fx, fy, fz = f
+    return np.stack((116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)))
+
+
+def _lab_to_xyz(lab):
+    L, a, b = lab
+    fy = (L + 16) / 116
+    f = np.stack((fy + a / 500, fy, fy - b / 200))
+    t = np.where(f > 6 / 29, f ** 3, 3 * (6 / 29) ** 2 * (f - 4 / 29))
+    return t * _WHITE_D65
+
+
+# Пространства: каналы и диапазоны для интерфейса
+SPACES = {
+    'rgb': (('R', 'G', 'B'), ((0, 255),) * 3),
+    'cmyk': (('C', 'M', 'Y', 'K'), ((0, 100),) * 4),
+    'hsv': (('H', 'S', 'V'), ((0, 360), (0, 100), (0, 100))),
+    'hsl': (('H', 'S', 'L'), ((0, 360), (0, 100), (0, 100))),
+    'linrgb': (('R', 'G', 'B'), ((0, 1),) * 3),
+    'xyz': (('X', 'Y', 'Z'), ((0, 95.047), (0, 100), (0, 108.883))),
+    'lab': (('L', 'a', 'b'), ((0, 100), (-128, 127), (-128, 127))),
+}
+
+_EDGES = {
+    ('rgb', 'cmyk'): _rgb_to_cmyk,
+    ('cmyk', 'rgb'): _cmyk_to_rgb,
+    ('rgb', 'hsv'): _rgb_to_hsv,
+    ('hsv', 'rgb'): _hsv_to_rgb,
+    ('rgb', 'hsl'): _rgb_to_hsl,
+    ('hsl', 'rgb'): _hsl_to_rgb,
+    ('rgb', 'linrgb'): _rgb_to_linrgb,
+    ('linrgb', 'rgb'): _linrgb_to_rgb,
+    ('linrgb', 'xyz'): _linrgb_to_xyz,
+    ('xyz', 'linrgb'): _xyz_to_linrgb,
+    ('xyz', 'lab'): _xyz_to_lab,
+    ('lab', 'xyz'): _lab_to_xyz,
+}
+
+
+@lru_cache(maxsize=None)
+def plan(src, dst):
+    """Кратчайший путь src -> dst по графу: кортеж пространств от src до dst."""
+    for space in (src, dst):
+        if space not in SPACES:
+            raise ValueError('неизвестное пространство: %r' % space)
+    prev = {src: None}
+    queue = deque([src])
+    while queue:
+        node = queue.popleft()
+        if node == dst:
+            break
+        for a, b in _EDGES:
+            if a == node and b not in prev:
+                prev[b] = node
+                queue.append(b)
+    path = [dst]
+    while path[-1] != src:
+        path.append(prev[path[-1]])
+    return tuple(reversed(path))
+
+
+def _quantize(channels, space):
+    """Округление до точности интерфейса: rgb -> uint8, прочее -> 2 знака."""
+    if space == 'rgb':
+        return _to_byte(channels)
+    return _round2(channels)
+
+
+def _run(arr, src, dsts, quantize):
+    """
+    Выполняет слитые пути src -> каждое из dsts блоками по CHUNK пикселей.
+    Общие промежуточные пространства считаются один раз на блок.
+    """
+    in_channels = len(SPACES[src][0])
+    a = np.asarray(arr)
+    if a.ndim < 1 or a.shape[-1] != in_channels:
+        raise ValueError('ожидается массив с %d каналами в последней оси, получено %r'
+                         % (in_channels, a.shape))
+    lead = a.shape[:-1]
+    pixels = a.reshape(-1, in_channels)
+    paths = [plan(src, dst) for dst in dsts]
+    outs = []
+    for dst in dsts:
+        dtype = np.uint8 if quantize and dst == 'rgb' else np.float64
+        outs.append(np.empty((pixels.shape[0], len(SPACES[dst][0])), dtype=dtype))
+    for start in range(0, pixels.shape[0], CHUNK):
+        # Каналы в отдельных непрерывных строках: (C, n)
+        cache = {src: np.ascontiguousarray(pixels[start:start + CHUNK].T, dtype=np.float64)}
+        for path, out in zip(paths, outs):
+            for a_space, b_space in zip(path, path[1:]):
+                if b_space not in cache:
+                    cache[b_space] = _EDGES[a_space, b_space](cache[a_space])
+            block = out[start:start + CHUNK]
+            # По одному каналу: временные массивы округления остаются в кэше
+            for i, channel in enumerate(cache[path[-1]]):
+                block[:, i] = _quantize(channel, path[-1]) if quantize else channel
+    return [out.reshape(lead + (out.shape[1],)) for out in outs]
+
+
+def convert(values, src, dst, quantize=False):
+    """
+    Преобразует массив (..., C) из пространства src в dst одним слитым проходом.
+    quantize=True округляет результат до точности интерфейса (rgb -> uint8).
+    """
+    return _run(values, src, (dst,), quantize)[0]
+
+
+def convert_many(values, src, dsts, quantize=False):
+    """Преобразование в несколько пространств сразу: {dst: массив}."""
+    return dict(zip(dsts, _run(values, src, tuple(dsts), quantize)))
+
+
+def rgb_to_cmyk_batch(rgb):
+    """RGB (0-255) -> CMYK (%), массив (..., 3) -> (..., 4) float64."""
+    lut = _lut_for(rgb)
+    if lut is not None:
+        return lut.rgb_to_cmyk(rgb)
+    return convert(rgb, 'rgb', 'cmyk', quantize=True)
+
+
+def cmyk_to_rgb_batch(cmyk):
+    """CMYK (%) -> RGB (0-255), массив (..., 4) -> (..., 3) uint8."""
+    return convert(cmyk, 'cmyk', 'rgb', quantize=True)
+
+
+def rgb_to_hsv_batch(rgb):
+    """RGB (0-255) -> HSV (H: 0-360, S/V: 0-100), массив (..., 3) -> (..., 3) float64."""
+    lut = _lut_for(rgb)
+    if lut is not None:
+        return lut.rgb_to_hsv(rgb)
+    return convert(rgb, 'rgb', 'hsv', quantize=True)
+
+
+def hsv_to_rgb_batch(hsv):
+    """HSV (H: 0-360, S/V: 0-100) -> RGB (0-255), массив (..., 3) -> (..., 3) uint8."""
+    return convert(hsv, 'hsv', 'rgb', quantize=True)
+
+
+# Скалярный путь: один цвет без создания массивов и поиска пути в графе
+
+def _byte(x):
+    return int(round(max(0, min(255, x))))
+
+
+def rgb_to_cmyk(r, g, b):
+    """RGB (0-255) -> CMYK (%) для одного цвета."""
+    r_p, g_p, b_p = r / 255.0, g / 255.0, b / 255.0
+    k = 1 - max(r_p, g_p, b_p)
+    if k == 1.0:
+        return 0.0, 0.0, 0.0, 100.0
+    d = 1 - k
+    return (round((1 - r_p - k) / d * 100, 2), round((1 - g_p - k) / d * 100, 2),
+            round((1 - b_p - k) / d * 100, 2), round(k * 100, 2))
+
+
+def cmyk_to_rgb(c, m, y, k):
+    """CMYK (%) -> RGB (0-255) для одного цвета."""
+    k_inv = 1 - k / 100.0
+    return (_byte(255 * (1 - c / 100.0) * k_inv), _byte(255 * (1 - m / 100.0) * k_inv),
+            _byte(255 * (1 - y / 100.0) * k_inv))
+
+
+def rgb_to_hsv(r, g, b):
+    """RGB (0-255) -> HSV (H: 0-360, S/V: 0-100) для одного цвета."""
+    h, s, v = colorsys.rgb_to_hsv(r / 255.0, g / 255.0, b / 255.0)
+    return round(h * 360, 2), round(s * 100, 2), round(v * 100, 2)
+
+
+def hsv_to_rgb(h, s, v):
+    """HSV (H: 0-360, S/V: 0-100) -> RGB (0-255) для одного цвета."""
+    r, g, b = colorsys.hsv_to_rgb((h % 360) / 360.0, s / 100.0, v / 100.0)
+    return _byte(r * 255), _byte(g * 255), _byte(b * 255)
@@ -0,0 +1,230 @@
+"""
+Целочисленный (fixed-point) путь для RGB -> CMYK и HSV -> RGB.
+
+CMYK и HSV хранятся в сотых долях (x * 100, как показывает интерфейс),
+поэтому все деления делаются над целыми с округлением половины к
+четному, без float, round() и clamp() на каждую компоненту.
+
+Совпадение с float-путем lab1.py:
+  * hsv_to_rgb_int совпадает всегда (для входов с точностью 0.01);
+  * rgb_to_cmyk_int совпадает всегда. В точных половинных случаях
+    (например, R=3, max=32: ровно 90.625 %) результат float-пути
+    определяется ошибкой двоичного округления, а не правилом «к
+    четному». Компонента C/M/Y зависит только от пары (компонента, max),
+    K -- только от max, поэтому поправки для всех 32896 пар один раз
+    вычисляются float-путем и хранятся в таблице (ненулевых -- несколько
+    десятков).
+
+Запуск модуля как скрипта сравнивает скорость двух путей и проверяет
+совпадение rgb_to_cmyk на всем кубе RGB.
+"""
+import argparse
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from colour_engine import (CHUNK, convert, rgb_to_cmyk_batch, hsv_to_rgb_batch,
+                           _HSV_SECTORS)
+
+# 6 секторов по 6000 сотых градуса
+_SECTOR = 6000
+_HSV_DEN = 10000 * 10000 * _SECTOR
+_SECTORS = tuple(tuple(row) for row in _HSV_SECTORS.tolist())
+
+
+def _div_round(n, d):
+    """Округленное n / d (половина к четному) для целых, d > 0."""
+    q, r = divmod(n, d)
+    if 2 * r > d or (2 * r == d and q & 1):
+        q += 1
+    return q
+
+
+def _div_round_batch(n, d):
+    """Векторный _div_round."""
+    q, r = np.divmod(n, d)
+    q += (2 * r > d) | ((2 * r == d) & ((q & 1) == 1))
+    return q
+
+
+@lru_cache(maxsize=None)
+def _cmyk_fixes():
+    """
+    Поправки к округлению «к четному» в половинных случаях, чтобы
+    совпадать с float-путем: int8 (256, 256) по [max, компонента] для
+    C/M/Y и (256,) по max для K. Вне половинных случаев -- нули.
+    """
+    mx, comp = np.tril_indices(256)
+    rgb = np.column_stack([comp, mx, np.zeros_like(mx)]).astype(np.float64)
+    expected = to_hundredths(convert(rgb, 'rgb', 'cmyk', quantize=True))
+    den = np.maximum(mx, 1)
+    fix = np.zeros((256, 256), dtype=np.int8)
+    fix[mx, comp] = expected[:, 0] - _div_round_batch(10000 * (mx - comp), den)
+    fix_k = np.zeros(256, dtype=np.int8)
+    fix_k[mx] = expected[:, 3] - _div_round_batch(10000 * (255 - mx), 255)
+    # Для скалярного пути -- словари только ненулевых поправок
+    scalar = ({(int(m), int(c)): int(fix[m, c]) for m, c in zip(*np.nonzero(fix))},
+              {int(m): int(fix_k[m]) for m in np.flatnonzero(fix_k)})
+    return fix, fix_k, scalar
+
+
+def to_hundredths(values):
+    """Значения с интерфейса (например, HSV) -> целые сотые."""
+    return np.rint(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+def rgb_to_cmyk_int(r, g, b):
+    """RGB (0-255) -> CMYK в сотых долях процента (0-10000)."""
+    mx = max(r, g, b)
+    if mx == 0:
+        return 0, 0, 0, 10000
+    fix, fix_k = _cmyk_fixes()[2]
+    return (_div_round(10000 * (mx - r), mx) + fix.get((mx, r), 0),
+            _div_round(10000 * (mx - g), mx) + fix.get((mx, g), 0),
+            _div_round(10000 * (mx - b), mx) + fix.get((mx, b), 0),
+            _div_round(10000 * (255 - mx), 255) + fix_k.get(mx, 0))
+
+
+def hsv_to_rgb_int(h, s, v):
+    """HSV в сотых (H: 0-36000, S/V: 0-10000) -> RGB (0-255)."""
+    h %= 36000
+    i, f = divmod(h, _SECTOR)
+    scale = 255 * v
+    v_ = scale * 10000 * _SECTOR
+    p = scale * (10000 - s) * _SECTOR
+    q = scale * (10000 * _SECTOR - s * f)
+    t = scale * (10000 * _SECTOR - s * (_SECTOR - f))
+    comps = (v_, t, p, q)
+    return tuple(max(0, min(255, _div_round(comps[j], _HSV_DEN))) for j in _SECTORS[i])
+
+
+def _blocks(arr, channels, out_channels, out_dtype, dtype):
+    """
+    Выходной массив и генератор блоков: вход блока -- непрерывные строки
+    каналов (C, n) нужного типа, выход -- представление в выходном массиве.
+    """
+    a = np.asarray(arr)
+    pixels = a.reshape(-1, channels)
+    out = np.empty(a.shape[:-1] + (out_channels,), dtype=out_dtype)
+    flat = out.reshape(-1, out_channels)
+    blocks = ((np.ascontiguousarray(pixels[start:start + CHUNK].T, dtype=dtype),
+               flat[start:start + CHUNK])
+              for start in range(0, pixels.shape[0], CHUNK))
+    return out, blocks
+
+
+def rgb_to_cmyk_int_batch(rgb):
+    """RGB (..., 3) -> CMYK в сотых (..., 4) uint16."""
+    fix, fix_k, _ = _cmyk_fixes()
+    flat_fix = fix.ravel()
+    result, blocks = _blocks(rgb, 3, 4, np.uint16, np.int32)
+    for (r, g, b), out in blocks:
+        mx = np.maximum(np.maximum(r, g), b)
+        # Для черного mx - c == 0, поэтому C = M = Y = 0 без отдельной ветки
+        den = np.maximum(mx, 1)
+        row = mx << 8
+        for i, comp in enumerate((r, g, b)):
+            out[:, i] = _div_round_batch(10000 * (mx - comp), den) + flat_fix[row | comp]
+        out[:, 3] = _div_round_batch(10000 * (255 - mx), 255) + fix_k[mx]
+    return result
+
+
+def hsv_to_rgb_int_batch(hsv):
+    """HSV в сотых (..., 3) целых -> RGB (..., 3) uint8."""
+    result, blocks = _blocks(hsv, 3, 3, np.uint8, np.int64)
+    for (h, s, v), out in blocks:
+        i, f = np.divmod(h % 36000, _SECTOR)
+        scale = 255 * v
+        comps = np.stack((
+            scale * (10000 * _SECTOR),
+            scale * (10000 * _SECTOR - s * (_SECTOR - f)),
+            scale * (10000 - s) * _SECTOR,
+            scale * (10000 * _SECTOR - s * f),
+        ))
+        # Сначала выбор компонент по сектору: делений 3, а не 4
+        rgb = np.take_along_axis(comps, _HSV_SECTORS[i].T, axis=0)
+        out[:] = np.clip(_div_round_batch(rgb, _HSV_DEN), 0, 255).T
+    return result
+
+
+def cube_mismatches(block=1 << 20):
+    """Число цветов всего куба RGB, где rgb_to_cmyk_int_batch расходится с float-путем."""
+    mismatches = 0
+    for start in range(0, 256 ** 3, block):
+        idx = np.arange(start, start + block, dtype=np.uint32)
+        rgb = np.column_stack([idx >> 16, (idx >> 8) & 0xFF, idx & 0xFF]).astype(np.uint8)
+        expected = to_hundredths(convert(rgb, 'rgb', 'cmyk', quantize=True))
+        mismatches += np.count_nonzero((rgb_to_cmyk_int_batch(rgb) != expected).any(axis=-1))
+    return mismatches
+
+
+def _timeit(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение float и fixed-point путей')
+    parser.add_argument('-n', type=int, default=2_000_000, help='число цветов в пакете')
+    parser.add_argument('--scalar-n', type=int, default=50_000, help='число скалярных вызовов')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from lab1 import rgb_to_cmyk, hsv_to_rgb_vals
+
+    rng = np.random.default_rng(args.seed)
+    rgb = rng.integers(0, 256, (args.n, 3), dtype=np.uint8)
+    hsv100 = np.stack([rng.integers(0, 36000, args.n),
+                       rng.integers(0, 10001, args.n),
+                       rng.integers(0, 10001, args.n)], axis=1)
+    hsv = hsv100 / 100.0
+
+    cmyk_float = rgb_to_cmyk_batch(rgb)
+    cmyk_int = rgb_to_cmyk_int_batch(rgb)
+    rgb_float = hsv_to_rgb_batch(hsv)
+    rgb_int = hsv_to_rgb_int_batch(hsv100)
+    cmyk_diff = np.count_nonzero((to_hundredths(cmyk_float) != cmyk_int).any(axis=-1))
+    hsv_diff = np.count_nonzero((rgb_float != rgb_int).any(axis=-1))
+
+    rows = [
+        ('rgb->cmyk batch', args.n,
+         _timeit(rgb_to_cmyk_batch, rgb), _timeit(rgb_to_cmyk_int_batch, rgb), cmyk_diff),
+        ('hsv->rgb batch', args.n,
+         _timeit(hsv_to_rgb_batch, hsv), _timeit(hsv_to_rgb_int_batch, hsv100), hsv_diff),
+    ]
+
+    sample = rgb[:args.scalar_n].tolist()
+    sample_hsv = hsv[:args.scalar_n].tolist()
+    sample_hsv100 = hsv100[:args.scalar_n].tolist()
+    cmyk_scalar_diff = sum(tuple(int(round(x * 100)) for x in rgb_to_cmyk(*c)) != rgb_to_cmyk_int(*c)
+                           for c in sample)
+    hsv_scalar_diff = sum(hsv_to_rgb_vals(*c) != hsv_to_rgb_int(*c100)
+                          for c, c100 in zip(sample_hsv, sample_hsv100))
+    rows += [
+        ('rgb->cmyk scalar', len(sample),
+         _timeit(lambda: [rgb_to_cmyk(*c) for c in sample], repeat=1),
+         _timeit(lambda: [rgb_to_cmyk_int(*c) for c in sample], repeat=1), cmyk_scalar_diff),
+        ('hsv->rgb scalar', len(sample),
+         _timeit(lambda: [hsv_to_rgb_vals(*c) for c in sample_hsv], repeat=1),
+         _timeit(lambda: [hsv_to_rgb_int(*c) for c in sample_hsv100], repeat=1), hsv_scalar_diff),
+    ]
+
+    print('%-18s %10s %12s %12s %8s %10s' % ('путь', 'цветов', 'float, Мц/с', 'int, Мц/с', 'ускор.', 'расхожд.'))
+    for name, n, t_float, t_int, diff in rows:
+        print('%-18s %10d %12.2f %12.2f %7.1fx %10s' % (
+            name, n, n / t_float / 1e6, n / t_int / 1e6, t_float / t_int,
+            '-' if diff is None else diff))
+
+    cube_diff = cube_mismatches()
+    print('rgb->cmyk, весь куб RGB: расхождений %d' % cube_diff)
+    if cube_diff or any(row[4] for row in rows):
+        raise SystemExit('целочисленный путь расходится с float-путем')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Таблица поиска (LUT) для преобразований RGB -> CMYK / HSV.
+
+8-битный куб RGB содержит всего 256**3 входов, поэтому значения
+rgb_to_cmyk и rgb_to_hsv_vals можно вычислить заранее. Таблица хранится
+в файле, который открывается через memory map: повторное преобразование
+сводится к одной выборке по индексу, а разные процессы делят одну копию
+через страничный кэш ОС.
+
+Значения хранятся в фиксированной точке uint16 (x * 100): все результаты
+округлены до 2 знаков и лежат в 0..36000. Деление k / 100.0 дает ровно
+то же число, что round(x, 2), поэтому выборка совпадает с расчетом.
+
+Построение идет по плоскостям R (256 плоскостей по 65536 цветов).
+После каждой плоскости в манифест записывается ее CRC32, поэтому
+прерванную сборку можно продолжить, а испорченные плоскости пересчитать.
+"""
+import argparse
+import json
+import os
+import zlib
+
+import numpy as np
+
+from colour_engine import rgb_to_cmyk_batch, rgb_to_hsv_batch
+
+FORMAT_VERSION = 1
+# Порядок каналов в таблице: C, M, Y, K, H, S, V
+CHANNELS = 7
+PLANE = 256 * 256
+SCALE = 100
+
+DEFAULT_DIR = os.environ.get(
+    'KG_LABS_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'kg_labs')
+)
+
+
+def _plane_values(r):
+    """Значения всех цветов плоскости R = r в фиксированной точке."""
+    g, b = np.divmod(np.arange(PLANE), 256)
+    # float64, а не uint8: иначе при включенном LUT расчет ушел бы в саму таблицу
+    rgb = np.empty((PLANE, 3), dtype=np.float64)
+    rgb[:, 0] = r
+    rgb[:, 1] = g
+    rgb[:, 2] = b
+    values = np.empty((PLANE, CHANNELS), dtype=np.float64)
+    values[:, :4] = rgb_to_cmyk_batch(rgb)
+    values[:, 4:] = rgb_to_hsv_batch(rgb)
+    return np.rint(values * SCALE).astype(np.uint16)
+
+
+class RgbLut:
+    """Таблица на диске: файл данных <name>.u16 и манифест <name>.json."""
+
+    def __init__(self, directory=None, name='rgb_lut'):
+        directory = directory or DEFAULT_DIR
+        self.data_path = os.path.join(directory, name + '.u16')
+        self.manifest_path = os.path.join(directory, name + '.json')
+        self._table = None
+
+    # Манифест
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != FORMAT_VERSION:
+            return {}
+        return {int(r): crc for r, crc in manifest.get('planes', {}).items()}
+
+    def _write_manifest(self, planes):
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION,
+                       'planes': {str(r): crc for r, crc in sorted(planes.items())}}, f)
+        os.replace(tmp, self.manifest_path)
+
+    def _open_data(self, mode):
+        return np.memmap(self.data_path, dtype=np.uint16, mode=mode,
+                         shape=(256, PLANE, CHANNELS))
+
+    # Построение и проверка
+
+    def _data_ok(self):
+        return (os.path.exists(self.data_path)
+                and os.path.getsize(self.data_path) == 256 * PLANE * CHANNELS * 2)
+
+    def is_complete(self):
+        return len(self._read_manifest()) == 256 and self._data_ok()
+
+    def verify(self):
+        """Возвращает список плоскостей, чья CRC32 не совпадает с манифестом."""
+        planes = self._read_manifest()
+        if not self._data_ok():
+            return sorted(planes)
+        data = self._open_data('r')
+        return [r for r, crc in sorted(planes.items())
+                if zlib.crc32(data[r]) != crc]
+
+    def build(self, validate=True, progress=None):
+        """
+        Достраивает недостающие плоскости. При validate=True уже
+        построенные плоскости проверяются по CRC32 и пересчитываются,
+        если данные повреждены.
+        """
+        os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+        planes = self._read_manifest()
+        if not self._data_ok():
+            planes = {}
+            data = self._open_data('w+')
+        else:
+            data = self._open_data('r+')
+        if validate:
+            for r in [r for r, crc in planes.items() if zlib.crc32(data[r]) != crc]:
+                del planes[r]
+
+        todo = [r for r in range(256) if r not in planes]
+        for done, r in enumerate(todo, 1):
+            data[r] = _plane_values(r)
+            data.flush()
+            planes[r] = zlib.crc32(data[r])
+            self._write_manifest(planes)
+            if progress is not None:
+                progress(done, len(todo))
+        del data
+        self._table = None
+        return len(todo)
+
+    # Выборка
+
+    def table(self):
+        """Таблица (256**3, 7) только для чтения."""
+        if self._table is None:
+            if not self.is_complete():
+                raise RuntimeError('таблица %s не построена, вызовите build()' % self.data_path)
+            self._table = self._open_data('r').reshape(256 ** 3, CHANNELS)
+        return self._table
+
+    def _lookup(self, rgb, channels):
+        a = np.asarray(rgb)
+        if a.dtype != np.uint8 or a.shape[-1] != 3:
+            raise ValueError('ожидается массив uint8 формы (..., 3), получено %s %r'
+                             % (a.dtype, a.shape))
+        idx = (a[..., 0].astype(np.intp) << 16) | (a[..., 1].astype(np.intp) << 8) | a[..., 2]
+        return self.table()[idx, channels] / float(SCALE)
+
+    def rgb_to_cmyk(self, rgb):
+        """RGB uint8 (..., 3) -> CMYK (..., 4), как rgb_to_cmyk_batch."""
+        return self._lookup(rgb, slice(0, 4))
+
+    def rgb_to_hsv(self, rgb):
+        """RGB uint8 (..., 3) -> HSV (..., 3), как rgb_to_hsv_batch."""
+        return self._lookup(rgb, slice(4, 7))
+
+
+def load_lut(directory=None, build=True, validate=False):
+    """
+    Открывает таблицу, при необходимости достраивая ее.
+    validate=True дополнительно сверяет CRC32 всех плоскостей.
+    """
+    lut = RgbLut(directory)
+    if build and (validate or not lut.is_complete()):
+        lut.build(validate=validate)
+    lut.table()
+    return lut
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Построение LUT RGB -> CMYK/HSV')
+    parser.add_argument('--dir', default=None, help='каталог кэша (по умолчанию %s)' % DEFAULT_DIR)
+    parser.add_argument('--verify', action='store_true', help='только проверить CRC32 плоскостей')
+    args = parser.parse_args()
+
+    lut = RgbLut(args.dir)
+    if args.verify:
+        bad = lut.verify()
+        missing = 256 - len(lut._read_manifest())
+        print('плоскостей с ошибкой CRC: %d, не построено: %d' % (len(bad), missing))
+        return
+    built = lut.build(progress=lambda done, total: print('\r%d/%d' % (done, total), end='', flush=True))
+    print('\nпостроено плоскостей: %d, файл: %s' % (built, lut.data_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Разделение изображения на цветовые плоскости C/M/Y/K или H/S/V.
+
+Изображение обрабатывается полосами строк из буфера, открытого через
+memory map, поэтому пиковая память определяется размером полосы, а не
+размером скана. Полосы распределяются по процессам. Значения плоскостей
+считаются движком colour_engine и совпадают с rgb_to_cmyk /
+rgb_to_hsv_vals бит в бит.
+
+Вход без распаковки открывается напрямую (.npy формы (H, W, 3) в RGB и
+двоичный PPM P6); остальные форматы один раз декодируются через cv2
+во временный .npy рядом с результатом. cv2 не умеет декодировать
+PNG/JPEG по частям, поэтому для них пик памяти на этом шаге -- весь
+декодированный кадр (3 байта на пиксель); ограничение размером полосы
+действует только для .npy и PPM. Большие сканы лучше один раз
+перевести в PPM.
+
+Пример:
+    python colour_separation.py scan.ppm out/ --mode cmyk --workers 4 --preview
+"""
+import argparse
+import os
+
+import numpy as np
+
+from colour_engine import rgb_to_cmyk_batch, rgb_to_hsv_batch
+
+MODES = {
+    'cmyk': (('C', 'M', 'Y', 'K'), rgb_to_cmyk_batch, (100, 100, 100, 100)),
+    'hsv': (('H', 'S', 'V'), rgb_to_hsv_batch, (360, 100, 100)),
+}
+
+# Пикселей в полосе по умолчанию (~1 Мп: несколько десятков МБ временных массивов)
+BAND_PIXELS = 1 << 20
+
+
+def _read_ppm_header(path):
+    """Возвращает (ширина, высота, смещение данных) двоичного PPM P6."""
+    with open(path, 'rb') as f:
+        head = f.read(1024)
+    tokens = []
+    pos = 0
+    while len(tokens) < 4:
+        while pos < len(head) and head[pos:pos + 1].isspace():
+            pos += 1
+        if head[pos:pos + 1] == b'#':
+            pos = head.index(b'\n', pos) + 1
+            continue
+        start = pos
+        while pos < len(head) and not head[pos:pos + 1].isspace():
+            pos += 1
+        tokens.append(head[start:pos])
+    if tokens[0] != b'P6' or int(tokens[3]) != 255:
+        raise ValueError('поддерживается только 8-битный PPM P6: %s' % path)
+    return int(tokens[1]), int(tokens[2]), pos + 1
+
+
+def open_rgb(path):
+    """
+    Открывает изображение как массив RGB uint8 (H, W, 3) через memory map.
+    Для форматов со сжатием возвращает None.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npy':
+        image = np.load(path, mmap_mode='r')
+        if image.dtype != np.uint8 or image.ndim != 3 or image.shape[2] != 3:
+            raise ValueError('ожидается .npy uint8 формы (H, W, 3): %s' % path)
+        return image
+    if ext in ('.ppm', '.pnm'):
+        w, h, offset = _read_ppm_header(path)
+        return np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(h, w, 3))
+    return None
+
+
+def _spill_to_npy(path, spill_path):
+    """Декодирует изображение через cv2 (целиком в памяти) и сохраняет его в .npy (RGB)."""
+    import cv2
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError('не удалось прочитать изображение: %s' % path)
+    out = np.lib.format.open_memmap(spill_path, mode='w+', dtype=np.uint8, shape=image.shape)
+    out[:] = image[..., ::-1]
+    out.flush()
+    del out
+
+
+def _separate_band(src, plane_paths, mode, fixed, start, stop):
+    """Обрабатывает строки start:stop в отдельном процессе."""
+    _, convert, _ = MODES[mode]
+    image = open_rgb(src)
+    values = convert(np.ascontiguousarray(image[start:stop]))
+    for i, path in enumerate(plane_paths):
+        plane = np.load(path, mmap_mode='r+')
+        if fixed:
+            plane[start:stop] = np.rint(values[..., i] * 100)
+        else:
+            plane[start:stop] = values[..., i]
+        plane.flush()
+    return stop - start
+
+
+def separate(path, out_dir, mode='cmyk', workers=None, band_rows=None, fixed=False):
+    """
+    Раскладывает изображение на плоскости и возвращает пути к .npy файлам.
+
+    fixed=True сохраняет значения в uint16 как x * 100 (точно, в 4 раза
+    компактнее float64).
+    """
+    names, _, _ = MODES[mode]
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(path))[0]
+
+    src = path
+    spill = None
+    image = open_rgb(path)
+    if image is None:
+        spill = os.path.join(out_dir, '.%s_rgb.npy' % stem)
+        _spill_to_npy(path, spill)
+        src = spill
+        image = open_rgb(spill)
+    h, w = image.shape[:2]
+    del image
+
+    dtype = np.uint16 if fixed else np.float64
+    plane_paths = []
+    for name in names:
+        plane_path = os.path.join(out_dir, '%s_%s.npy' % (stem, name))
+        np.lib.format.open_memmap(plane_path, mode='w+', dtype=dtype, shape=(h, w)).flush()
+        plane_paths.append(plane_path)
+
+    band_rows = band_rows or max(1, BAND_PIXELS // max(w, 1))
+    bands = [(start, min(start + band_rows, h)) for start in range(0, h, band_rows)]
+    try:
+        if workers == 1:
+            for start, stop in bands:
+                _separate_band(src, plane_paths, mode, fixed, start, stop)
+        else:
+            # Пул процессов нужен только здесь: импорт multiprocessing не замедляет
+            # модули, которые используют лишь однопроцессные функции
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(workers) as pool:
+                jobs = [pool.submit(_separate_band, src, plane_paths, mode, fixed, start, stop)
+                        for start, stop in bands]
+                for job in jobs:
+                    job.result()
+    finally:
+        if spill is not None:
+            os.remove(spill)
+    return plane_paths
+
+
+def write_previews(plane_paths, mode, fixed=False):
+    """Сохраняет 8-битные PNG-превью плоскостей рядом с .npy."""
+    import cv2
+    _, _, limits = MODES[mode]
+    previews = []
+    for plane_path, limit in zip(plane_paths, limits):
+        plane = np.load(plane_path, mmap_mode='r')
+        scale = 255.0 / (limit * 100 if fixed else limit)
+        preview = np.empty(plane.shape, dtype=np.uint8)
+        band_rows = max(1, BAND_PIXELS // max(plane.shape[1], 1))
+        for start in range(0, plane.shape[0], band_rows):
+            preview[start:start + band_rows] = np.rint(plane[start:start + band_rows] * scale)
+        preview_path = os.path.splitext(plane_path)[0] + '.png'
+        cv2.imwrite(preview_path, preview)
+        previews.append(preview_path)
+    return previews
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Разделение изображения на плоскости CMYK / HSV')
+    parser.add_argument('image', help='изображение (.npy, .ppm или любой формат cv2; сжатые '
+                                      'форматы декодируются в память целиком)')
+    parser.add_argument('out_dir', help='каталог для плоскостей')
+    parser.add_argument('--mode', choices=sorted(MODES), default='cmyk')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='число процессов (по умолчанию по числу ядер, 1 - без пула)')
+    parser.add_argument('--band-rows', type=int, default=None, help='строк в полосе')
+    parser.add_argument('--fixed', action='store_true', help='хранить uint16 (x * 100) вместо float64')
+    parser.add_argument('--preview', action='store_true', help='дополнительно сохранить PNG-превью')
+    args = parser.parse_args()
+
+    paths = separate(args.image, args.out_dir, args.mode, args.workers, args.band_rows, args.fixed)
+    if args.preview:
+        paths += write_previews(paths, args.mode, args.fixed)
+    for p in paths:
+        print(p)
+
+
+if __name__ == '__main__':
+    main()
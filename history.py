@@ -0,0 +1,141 @@
+"""
+История отмены и повтора для вкладок лабораторной 2.
+
+Запись хранит состояние вкладки (параметры операции или список шагов --
+по нему результат всегда можно пересчитать) и, если передан, снимок
+результата. Снимки сжимаются без потерь (PNG) в фоновом потоке, и их
+суммарный размер не превышает budget байт: сначала удаляются снимки
+записей, дальше всего отстоящих от текущей. При возврате к такой записи
+результат пересчитывается по ее состоянию.
+
+Бюджет по умолчанию задается переменной окружения KG_LABS_HISTORY_MB.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+DEFAULT_BUDGET = int(os.environ.get('KG_LABS_HISTORY_MB', 256)) << 20
+DEFAULT_DEPTH = 100
+# Быстрое сжатие: на фотографиях RLE почти не уступает полному PNG
+_PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1, cv2.IMWRITE_PNG_STRATEGY, cv2.IMWRITE_PNG_STRATEGY_RLE]
+
+Entry = namedtuple('Entry', 'state snapshot')
+
+
+class Snapshot:
+    """Изображение записи: исходный массив, пока не сжат, затем PNG."""
+
+    def __init__(self, image):
+        self._image = image
+        self._data = None
+
+    def compress(self):
+        image = self._image
+        if image is None:  # снимок уже удален из истории
+            return
+        ok, data = cv2.imencode('.png', image, _PNG_PARAMS)
+        if ok:
+            self._data = data  # сначала данные, потом освобождение массива
+            self._image = None
+
+    def release(self):
+        self._image = None
+        self._data = None
+
+    @property
+    def nbytes(self):
+        image = self._image
+        return image.nbytes if image is not None else self._data.nbytes
+
+    def image(self):
+        """Массив снимка (распаковывается при каждом вызове)."""
+        image = self._image
+        if image is not None:
+            return image
+        return cv2.imdecode(self._data, cv2.IMREAD_UNCHANGED)
+
+
+class History:
+    """Линейная история: новая запись после отмены отбрасывает ветку повтора."""
+
+    def __init__(self, budget=DEFAULT_BUDGET, depth=DEFAULT_DEPTH):
+        self.budget = budget
+        self.depth = depth
+        self.evicted = 0
+        self._entries = []
+        self._index = -1
+        self._executor = ThreadPoolExecutor(1)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return sum(e.snapshot.nbytes for e in self._entries if e.snapshot is not None)
+
+    @property
+    def can_undo(self):
+        return self._index > 0
+
+    @property
+    def can_redo(self):
+        return self._index < len(self._entries) - 1
+
+    def clear(self):
+        for entry in self._entries:
+            if entry.snapshot is not None:
+                entry.snapshot.release()
+        self._entries = []
+        self._index = -1
+
+    def push(self, state, image=None):
+        """Добавляет запись после текущей; image -- результат для снимка."""
+        for entry in self._entries[self._index + 1:]:
+            if entry.snapshot is not None:
+                entry.snapshot.release()
+        del self._entries[self._index + 1:]
+        snapshot = None
+        if image is not None and image.nbytes <= self.budget:
+            snapshot = Snapshot(image)
+            self._executor.submit(snapshot.compress)
+        self._entries.append(Entry(state, snapshot))
+        if len(self._entries) > self.depth:
+            self._drop(0)
+        self._index = len(self._entries) - 1
+        self._trim()
+
+    def undo(self):
+        """Предыдущая запись или None."""
+        if not self.can_undo:
+            return None
+        self._index -= 1
+        return self._entries[self._index]
+
+    def redo(self):
+        """Следующая запись или None."""
+        if not self.can_redo:
+            return None
+        self._index += 1
+        return self._entries[self._index]
+
+    def _drop(self, i):
+        entry = self._entries.pop(i)
+        if entry.snapshot is not None:
+            entry.snapshot.release()
+
+    def _trim(self):
+        """Удаляет снимки самых далеких от текущей записей, пока не уложится в бюджет."""
+        total = self.nbytes
+        order = sorted(range(len(self._entries)), key=lambda i: -abs(i - self._index))
+        for i in order:
+            if total <= self.budget:
+                break
+            entry = self._entries[i]
+            if entry.snapshot is None or i == self._index:
+                continue
+            total -= entry.snapshot.nbytes
+            entry.snapshot.release()
+            self._entries[i] = Entry(entry.state, None)
+            self.evicted += 1
@@ -0,0 +1,546 @@
+"""
+Операции обработки изображений лабораторной 2 без зависимости от Qt.
+
+Функции принимают и возвращают массивы cv2 (BGR или оттенки серого) и
+повторяют вычисления вкладок lab2.py, поэтому их можно вызывать из
+фоновых потоков, процессов и консольных утилит.
+"""
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from profiler import span
+
+# Формы структурирующего элемента: имя -> константа cv2
+SHAPES = {
+    'rect': cv2.MORPH_RECT,
+    'ellipse': cv2.MORPH_ELLIPSE,
+    'cross': cv2.MORPH_CROSS,
+}
+
+# Длинная сторона уменьшенной копии для живого просмотра
+PROXY_SIDE = 1024
+
+# Морфологические операции; для составных итерации не используются
+MORPH_OPS = ('erode', 'dilate', 'open', 'close', 'gradient')
+
+# С какого окна прямоугольник считается алгоритмом ван Херка -- Гил --
+# Вермана (время на пиксель не зависит от окна). Прямоугольные ядра cv2
+# и так раскладывает на строку и столбец, но стоимость растет с окном:
+# на 12 Мп кадре ван Херк выигрывает начиная с ~160 пикселей.
+VHGW_MIN = 160
+
+
+@lru_cache(maxsize=None)
+def get_kernel(shape, size):
+    """Структурирующий элемент формы shape размером size x size (кешируется)."""
+    kernel = cv2.getStructuringElement(SHAPES[shape], (size, size))
+    kernel.setflags(write=False)
+    return kernel
+
+
+def make_proxy(image, max_side=PROXY_SIDE):
+    """Уменьшенная копия для живого просмотра и ее масштаб (не больше 1)."""
+    h, w = image.shape[:2]
+    factor = min(1.0, max_side / max(h, w))
+    if factor == 1.0:
+        return image, factor
+    size = (max(1, round(w * factor)), max(1, round(h * factor)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), factor
+
+
+def scale_kernel(size, factor):
+    """Нечетный размер ядра, эквивалентный size на изображении в масштабе factor."""
+    return max(1, 2 * round((size - 1) * factor / 2) + 1)
+
+
+def _window(a, lo, hi, op, fill):
+    """
+    op по окну строк [i + lo, i + hi] массива (H, M) для каждой строки i;
+    за краем -- fill. Алгоритм ван Херка -- Гил -- Вермана: префиксные и
+    суффиксные экстремумы блоков длины окна, две операции на элемент.
+    """
+    length = hi - lo + 1
+    n, m = a.shape
+    blocks = -(-(n + length - 1) // length)
+    # p[k] = a[k + lo]: окно строки i начинается в p[i]
+    p = np.full((blocks * length, m), fill, dtype=a.dtype)
+    dst, src = max(0, -lo), max(0, lo)
+    count = min(n - src, blocks * length - dst)
+    p[dst:dst + count] = a[src:src + count]
+    pre = p.reshape(blocks, length, m)
+    suf = pre.copy()
+    for j in range(1, length):
+        op(pre[:, j - 1], pre[:, j], out=pre[:, j])
+        op(suf[:, length - j], suf[:, length - j - 1], out=suf[:, length - j - 1])
+    pre = pre.reshape(-1, m)
+    suf = suf.reshape(-1, m)
+    return op(suf[:n], pre[length - 1:length - 1 + n])
+
+
+def _rect_vhgw(image, lo, hi, op):
+    """Прямоугольник [lo, hi] x [lo, hi]: проход по столбцам, затем по строкам через транспонирование."""
+    info = np.iinfo(image.dtype) if np.issubdtype(image.dtype, np.integer) else np.finfo(image.dtype)
+    fill = info.max if op is np.minimum else info.min
+    h = image.shape[0]
+    a = _window(image.reshape(h, -1), lo, hi, op, fill).reshape(image.shape)
+    t = cv2.transpose(a)
+    t = _window(t.reshape(t.shape[0], -1), lo, hi, op, fill).reshape(t.shape)
+    return cv2.transpose(t)
+
+
+def _rect_window(shape, size, iterations):
+    """
+    Окно [lo, hi], равное iterations повторам прямоугольника size, если
+    оно достаточно велико для ван Херка, иначе None. Свертывание точное:
+    граница по умолчанию не участвует в минимуме/максимуме.
+    """
+    if shape != 'rect':
+        return None
+    lo = -(size // 2) * iterations
+    hi = (size - 1 - size // 2) * iterations
+    return (lo, hi) if hi - lo + 1 >= VHGW_MIN else None
+
+
+_MORPH_EX = {
+    'open': cv2.MORPH_OPEN,
+    'close': cv2.MORPH_CLOSE,
+    'gradient': cv2.MORPH_GRADIENT,
+}
+
+
+def morphology(image, op, shape='rect', size=5, iterations=1):
+    """
+    Применяет морфологическую операцию op и возвращает новый массив.
+    Большие прямоугольники (с учетом итераций) считаются ван Херком, прочие
+    ядра -- cv2; результат совпадает с cv2.erode / cv2.dilate /
+    cv2.morphologyEx бит в бит.
+    """
+    if op not in MORPH_OPS:
+        raise ValueError('неизвестная операция: %r' % op)
+    if op not in ('erode', 'dilate'):
+        iterations = 1
+    window = _rect_window(shape, size, iterations)
+    if window is None or image.ndim not in (2, 3):
+        kernel = get_kernel(shape, size)
+        with span('morph.cv2', op=op, shape=shape, size=size):
+            if op == 'erode':
+                return cv2.erode(image, kernel, iterations=iterations)
+            if op == 'dilate':
+                return cv2.dilate(image, kernel, iterations=iterations)
+            return cv2.morphologyEx(image, _MORPH_EX[op], kernel)
+
+    with span('morph.vhgw', op=op, size=size):
+        return _rect_morphology(image, op, *window)
+
+
+def _rect_morphology(image, op, lo, hi):
+    if op == 'erode':
+        return _rect_vhgw(image, lo, hi, np.minimum)
+    if op == 'dilate':
+        return _rect_vhgw(image, lo, hi, np.maximum)
+    if op == 'open':
+        return _rect_vhgw(_rect_vhgw(image, lo, hi, np.minimum), lo, hi, np.maximum)
+    if op == 'close':
+        return _rect_vhgw(_rect_vhgw(image, lo, hi, np.maximum), lo, hi, np.minimum)
+    return cv2.subtract(_rect_vhgw(image, lo, hi, np.maximum), _rect_vhgw(image, lo, hi, np.minimum))
+
+
+# Бинарная морфология: маска упакована по 64 пикселя строки в слово uint64
+
+_ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def is_binary(image):
+    """Маска 0/255: оттенки серого или все каналы одинаковы."""
+    if image.dtype != np.uint8 or image.ndim not in (2, 3) or image.size == 0:
+        return False
+    if cv2.countNonZero(cv2.inRange(image.reshape(image.shape[0], -1), 1, 254)):
+        return False
+    if image.ndim == 2:
+        return True
+    first = cv2.extractChannel(image, 0)
+    return all(np.array_equal(first, image[..., c]) for c in range(1, image.shape[2]))
+
+
+class PackedMask:
+    """
+    Бинарное изображение в битах: words (H, ceil(W / 64)) uint64, бит j
+    слова k строки -- пиксель 64 * k + j. В 8 раз меньше маски uint8 и в
+    24 раза меньше BGR. channels -- сколько каналов вернуть при распаковке.
+    """
+    __slots__ = ('words', 'width', 'channels')
+
+    def __init__(self, words, width, channels):
+        self.words = words
+        self.width = width
+        self.channels = channels
+
+    @classmethod
+    def from_image(cls, image):
+        """Упаковывает маску 0/255 (см. is_binary)."""
+        with span('binary.pack'):
+            mask = cv2.extractChannel(image, 0) if image.ndim == 3 else image
+            h, w = mask.shape
+            n = -(-w // 64)
+            packed = np.zeros((h, n * 8), dtype=np.uint8)
+            packed[:, :-(-w // 8)] = np.packbits(mask, axis=1, bitorder='little')
+        return cls(packed.view('<u8'), w, image.shape[2] if image.ndim == 3 else 0)
+
+    def to_image(self):
+        with span('binary.unpack'):
+            bits = np.unpackbits(self.words.view(np.uint8), axis=1, count=self.width,
+                                 bitorder='little')
+            mask = np.multiply(bits, 255, out=bits)
+            if self.channels == 0:
+                return mask
+            return cv2.merge([mask] * self.channels)
+
+    @property
+    def shape(self):
+        h = self.words.shape[0]
+        return (h, self.width) if self.channels == 0 else (h, self.width, self.channels)
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes
+
+    def setflags(self, write):
+        self.words.setflags(write=write)
+
+
+def _hshift(a, s, fill):
+    """out[:, x] = a[:, x + s] по битам строк; за краем -- fill (0 или все единицы)."""
+    if s == 0:
+        return a
+    n = a.shape[1]
+    q, r = divmod(abs(s), 64)
+    out = np.full_like(a, fill)
+    if q >= n:
+        return out
+    if s > 0:
+        src, dst = a[:, q:], out[:, :n - q]
+        if r == 0:
+            dst[...] = src
+        else:
+            np.right_shift(src, np.uint64(r), out=dst)
+            dst[:, :-1] |= src[:, 1:] << np.uint64(64 - r)
+            dst[:, -1] |= fill << np.uint64(64 - r)
+    else:
+        src, dst = a[:, :n - q], out[:, q:]
+        if r == 0:
+            dst[...] = src
+        else:
+            np.left_shift(src, np.uint64(r), out=dst)
+            dst[:, 1:] |= src[:, :-1] >> np.uint64(64 - r)
+            dst[:, 0] |= fill >> np.uint64(64 - r)
+    return out
+
+
+def _vshift(a, s, fill):
+    """out[y] = a[y + s]; строки за краем -- fill."""
+    if s == 0:
+        return a
+    h = a.shape[0]
+    out = np.full_like(a, fill)
+    if abs(s) < h:
+        if s > 0:
+            out[:h - s] = a[s:]
+        else:
+            out[-s:] = a[:h + s]
+    return out
+
+
+def _bit_run(a, length, step, op, fill, shift):
+    """op по a[x], a[x + step], ..., length элементов (step = 1 или -1) удвоением."""
+    result = None
+    cur, cur_len, pos = a, 1, 0
+    while length:
+        if length & 1:
+            part = shift(cur, pos * step, fill)
+            result = part if result is None else op(result, part)
+            pos += cur_len
+        length >>= 1
+        if length:
+            cur = op(cur, shift(cur, cur_len * step, fill))
+            cur_len *= 2
+    return result
+
+
+def _bit_window(a, lo, hi, op, fill, shift):
+    """
+    op по окну [x + lo, x + hi] за O(log окна) сдвигов. Окно режется по
+    нулю на две половины: каждая сдвигается только в свою сторону, и
+    значения за краем остаются нейтральными (fill).
+    """
+    if lo > 0:
+        return shift(_bit_run(a, hi - lo + 1, 1, op, fill, shift), lo, fill)
+    if hi < 0:
+        return shift(_bit_run(a, hi - lo + 1, -1, op, fill, shift), hi, fill)
+    result = _bit_run(a, hi + 1, 1, op, fill, shift)
+    if lo < 0:
+        result = op(result, _bit_run(a, 1 - lo, -1, op, fill, shift))
+    return result
+
+
+@lru_cache(maxsize=None)
+def _kernel_runs(shape, size):
+    """Ядро как {(x0, x1): [(y0, y1), ...]}: строки с одинаковым отрезком, сгруппированные в интервалы."""
+    kernel = get_kernel(shape, size)
+    anchor = size // 2
+    runs = {}
+    for i, row in enumerate(kernel):
+        cols = np.flatnonzero(row)
+        if cols.size == 0:
+            continue
+        # Строки ядер cv2 -- один отрезок; прочие разбиваем по разрывам
+        breaks = np.flatnonzero(np.diff(cols) > 1)
+        for start, stop in zip(np.r_[0, breaks + 1], np.r_[breaks, cols.size - 1]):
+            intervals = runs.setdefault((int(cols[start]) - anchor, int(cols[stop]) - anchor), [])
+            dy = i - anchor
+            if intervals and intervals[-1][1] == dy - 1:
+                intervals[-1] = (intervals[-1][0], dy)
+            else:
+                intervals.append((dy, dy))
+    return runs
+
+
+def _binary_extreme(words, width, op_name, shape, size, iterations):
+    """Эрозия (AND) или дилатация (OR) упакованной маски; граница, как в cv2, не участвует."""
+    op = np.bitwise_and if op_name == 'erode' else np.bitwise_or
+    fill = _ONES if op_name == 'erode' else np.uint64(0)
+    if shape == 'rect':
+        # Итерации прямоугольника сворачиваются в один прямоугольник, как в morphology
+        lo, hi = -(size // 2) * iterations, (size - 1 - size // 2) * iterations
+        runs = {(lo, hi): [(lo, hi)]}
+        iterations = 1
+    else:
+        runs = _kernel_runs(shape, size)
+    pad = width % 64
+    for _ in range(iterations):
+        if pad:
+            # Биты за правым краем ведут себя как граница: нейтральны для op
+            tail = _ONES << np.uint64(pad)
+            words = words.copy()
+            if op_name == 'erode':
+                words[:, -1] |= tail
+            else:
+                words[:, -1] &= ~tail
+        result = None
+        for (x0, x1), intervals in runs.items():
+            row = _bit_window(words, x0, x1, op, fill, _hshift)
+            for y0, y1 in intervals:
+                part = _bit_window(row, y0, y1, op, fill, _vshift)
+                result = part if result is None else op(result, part)
+        words = result
+    return words
+
+
+def binary_morphology(mask, op, shape='rect', size=5, iterations=1):
+    """
+    morphology для PackedMask: побитовые AND/OR сдвинутых слов вместо
+    min/max по пикселям. После распаковки совпадает с cv2 для маски 0/255.
+    """
+    if op not in MORPH_OPS:
+        raise ValueError('неизвестная операция: %r' % op)
+    with span('morph.binary', op=op, shape=shape, size=size):
+        return PackedMask(_binary_words(mask, op, shape, size, iterations), mask.width, mask.channels)
+
+
+def _binary_words(mask, op, shape, size, iterations):
+    words, width = mask.words, mask.width
+    if op in ('erode', 'dilate'):
+        words = _binary_extreme(words, width, op, shape, size, iterations)
+    elif op == 'open':
+        words = _binary_extreme(_binary_extreme(words, width, 'erode', shape, size, 1),
+                                width, 'dilate', shape, size, 1)
+    elif op == 'close':
+        words = _binary_extreme(_binary_extreme(words, width, 'dilate', shape, size, 1),
+                                width, 'erode', shape, size, 1)
+    else:
+        dilated = _binary_extreme(words, width, 'dilate', shape, size, 1)
+        eroded = _binary_extreme(words, width, 'erode', shape, size, 1)
+        # 255 - 255 и 0 - 255 насыщаются в 0, как cv2.subtract
+        words = np.bitwise_and(dilated, ~eroded)
+    return words
+
+
+# Методы повышения резкости и точность вычислений (float64 -- эталон)
+SHARPEN_METHODS = ('laplacian', 'log')
+SHARPEN_PRECISIONS = ('float64', 'float32', 'int16')
+
+# Сдвиг (x 2**n) яркости в int16 перед гауссианом LoG: 4 бита дробной части
+_LOG_SHIFT = 4
+
+
+def sharpen(image, method='laplacian', ksize=3, sigma=1.0, alpha=1.0):
+    """
+    Повышение резкости вычитанием лапласиана яркости из каждого канала.
+    method='log' сглаживает яркость гауссианом перед лапласианом.
+    """
+    if method not in SHARPEN_METHODS:
+        raise ValueError('неизвестный метод: %r' % method)
+    with span('sharpen.to_float'):
+        img_float = image.astype(np.float64) / 255.0
+
+    if image.ndim == 3:
+        with span('sharpen.cvtColor'):
+            gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    else:
+        gray_image = image
+    with span('sharpen.to_float'):
+        gray_float = gray_image.astype(np.float64) / 255.0
+
+    with span('sharpen.filter', method=method, ksize=ksize):
+        if method == 'laplacian':
+            edge_mask = cv2.Laplacian(gray_float, cv2.CV_64F, ksize=ksize)
+        else:
+            blur_ksize = ksize if ksize % 2 != 0 else ksize + 1
+            if blur_ksize == 1:
+                blur_ksize = 3
+            blurred = cv2.GaussianBlur(gray_float, (blur_ksize, blur_ksize), sigma)
+            edge_mask = cv2.Laplacian(blurred, cv2.CV_64F, ksize=1)
+
+    with span('sharpen.combine'):
+        if image.ndim == 3:
+            sharpened_float = img_float - alpha * edge_mask[..., None]
+        else:
+            sharpened_float = gray_float - alpha * edge_mask
+        sharpened_float = np.clip(sharpened_float, 0, 1)
+    with span('sharpen.to_uint8'):
+        return (sharpened_float * 255).astype(np.uint8)
+
+
+@lru_cache(maxsize=None)
+def _laplacian_gain(ksize):
+    """Сумма модулей коэффициентов ядра cv2.Laplacian -- предел его отклика на 0..1."""
+    n = 2 * max(ksize, 3) + 1
+    impulse = np.zeros((n, n))
+    impulse[n // 2, n // 2] = 1
+    kernel = cv2.Laplacian(impulse, cv2.CV_64F, ksize=ksize, borderType=cv2.BORDER_CONSTANT)
+    return float(np.abs(kernel).sum())
+
+
+class FastSharpener:
+    """
+    Повышение резкости в float32 или int16 с переиспользуемыми буферами.
+
+    Маска краев считается один раз на кадр в единицах яркости 0..255,
+    затем вычитание из всех каналов, ограничение и перевод в uint8
+    выполняются за один проход полосами строк. От эталона sharpen()
+    результат отличается не более чем на единицу яркости: эталон теряет
+    ее сам на (x / 255) * 255 и отбрасывании дробной части. Исключение --
+    Лапласиан с ksize >= 13, где отклик так велик, что неточен и эталон.
+
+    int16 применим, пока отклик лапласиана помещается в 16 бит
+    (Лапласиан с ksize <= 5, LoG с любым ksize); иначе считается в float32.
+    Лапласиан с ksize >= 11 дает отклик больше 2**24, который float32 не
+    представляет точно, -- для него маска считается в float64.
+    """
+
+    def __init__(self, precision='float32', band_rows=64):
+        if precision not in ('float32', 'int16'):
+            raise ValueError('быстрый путь поддерживает float32 и int16: %r' % precision)
+        self.precision = precision
+        self.band_rows = band_rows
+        self._buffers = {}
+
+    @property
+    def nbytes(self):
+        """Память, занятая буферами между вызовами."""
+        return sum(buf.nbytes for buf in self._buffers.values())
+
+    def _buffer(self, name, shape, dtype):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buf
+        return buf
+
+    def _int16_shift(self, method, ksize):
+        """Сдвиг фиксированной точки для int16 или None, если отклик не помещается."""
+        if method == 'log':
+            return _LOG_SHIFT
+        return 0 if 255 * _laplacian_gain(ksize) <= np.iinfo(np.int16).max else None
+
+    def _edges(self, gray, method, ksize, sigma, shift):
+        """Маска краев, умноженная на 2**shift (shift=None -- float32)."""
+        h, w = gray.shape
+        if method == 'log':
+            blur_ksize = ksize if ksize % 2 != 0 else ksize + 1
+            if blur_ksize == 1:
+                blur_ksize = 3
+        if shift is None:
+            if method == 'laplacian':
+                if 255 * _laplacian_gain(ksize) > 2 ** 24:
+                    return cv2.Laplacian(gray, cv2.CV_64F, dst=self._buffer('edges64', (h, w), np.float64),
+                                         ksize=ksize)
+                return cv2.Laplacian(gray, cv2.CV_32F, dst=self._buffer('edges', (h, w), np.float32),
+                                     ksize=ksize)
+            edges = self._buffer('edges', (h, w), np.float32)
+            src = self._buffer('gray32', (h, w), np.float32)
+            np.copyto(src, gray)
+            blurred = cv2.GaussianBlur(src, (blur_ksize, blur_ksize), sigma,
+                                       dst=self._buffer('blur32', (h, w), np.float32))
+            return cv2.Laplacian(blurred, cv2.CV_32F, dst=edges, ksize=1)
+
+        edges = self._buffer('edges16', (h, w), np.int16)
+        if method == 'laplacian':
+            return cv2.Laplacian(gray, cv2.CV_16S, dst=edges, ksize=ksize)
+        src = self._buffer('gray16', (h, w), np.int16)
+        np.left_shift(gray, shift, out=src, dtype=np.int16)
+        blurred = cv2.GaussianBlur(src, (blur_ksize, blur_ksize), sigma,
+                                   dst=self._buffer('blur16', (h, w), np.int16))
+        return cv2.Laplacian(blurred, cv2.CV_16S, dst=edges, ksize=1)
+
+    def __call__(self, image, method='laplacian', ksize=3, sigma=1.0, alpha=1.0, out=None):
+        if method not in SHARPEN_METHODS:
+            raise ValueError('неизвестный метод: %r' % method)
+        h, w = image.shape[:2]
+        if image.ndim == 3:
+            with span('sharpen.cvtColor'):
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY,
+                                    dst=self._buffer('gray', (h, w), np.uint8))
+        else:
+            gray = image
+        shift = self._int16_shift(method, ksize) if self.precision == 'int16' else None
+        with span('sharpen.filter', method=method, ksize=ksize, precision=self.precision):
+            edges = self._edges(gray, method, ksize, sigma, shift)
+
+        if out is None:
+            out = np.empty_like(image)
+        with span('sharpen.combine', precision=self.precision):
+            return self._combine(image, edges, alpha, shift, out)
+
+    def _combine(self, image, edges, alpha, shift, out):
+        """out = clip(image - alpha * edges) полосами по band_rows строк."""
+        h, w = image.shape[:2]
+        rows = self.band_rows
+        band_shape = (rows,) + image.shape[1:]
+        if shift is None:
+            edges *= alpha
+            acc = self._buffer('band_f', band_shape, edges.dtype)
+            for start in range(0, h, rows):
+                n = min(rows, h - start)
+                src, mask, band = image[start:start + n], edges[start:start + n], acc[:n]
+                np.subtract(src, mask[..., None] if image.ndim == 3 else mask, out=band)
+                np.clip(band, 0, 255, out=band)
+                np.copyto(out[start:start + n], band, casting='unsafe')
+            return out
+
+        # int16: маска уже в x 2**shift, alpha -- в x 2**8; сумма в int32 полосы
+        scale = shift + 8
+        a = int(round(alpha * 256))
+        acc = self._buffer('band_i32', band_shape, np.int32)
+        scaled = self._buffer('mask_i32', (rows, w), np.int32)
+        for start in range(0, h, rows):
+            n = min(rows, h - start)
+            src, band, mask = image[start:start + n], acc[:n], scaled[:n]
+            np.multiply(edges[start:start + n], a, out=mask, dtype=np.int32)
+            np.left_shift(src, scale, out=band, dtype=np.int32)
+            np.subtract(band, mask[..., None] if image.ndim == 3 else mask, out=band)
+            np.right_shift(band, scale, out=band)
+            np.clip(band, 0, 255, out=band)
+            np.copyto(out[start:start + n], band, casting='unsafe')
+        return out
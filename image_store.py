@@ -0,0 +1,159 @@
+"""
+Общее хранилище декодированных изображений для вкладок лабораторной 2.
+
+Файл декодируется один раз: повторная загрузка в любой вкладке получает
+тот же массив из кеша. Массивы выдаются только для чтения, поэтому их
+можно без копирования делить между вкладками, цепочкой и историей; код,
+которому нужно изменить пиксели, получает копию через writable()
+(копирование при записи).
+
+Для показа, пока идет полное декодирование, preview() читает JPEG
+сразу уменьшенным (IMREAD_REDUCED_COLOR_2/4/8: декодируется в 4-64 раза
+меньше пикселей); коэффициент выбирается по размеру из заголовка, так
+что файл декодируется один раз. Остальные форматы cv2 все равно
+декодирует целиком, поэтому для них превью -- полное изображение, оно же
+нужно и для обработки. Кеш ограничен по байтам и
+вытесняет давно не использованные изображения (LRU); ключ включает время
+изменения и размер файла.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from image_ops import PROXY_SIDE
+from profiler import span
+
+DEFAULT_BUDGET = 256 << 20
+# Коэффициент уменьшения -> флаг cv2.imread
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+# Маркеры SOFn с размером кадра (C4, C8, CC -- таблицы, а не кадр)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def writable(image):
+    """image, если его можно изменять, иначе копия."""
+    return image if image.flags.writeable else image.copy()
+
+
+def jpeg_size(path):
+    """(ширина, высота) JPEG по заголовку кадра без декодирования; None для других форматов."""
+    with open(path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            code = marker[1]
+            if code == 0xFF:
+                # Байты-заполнители перед маркером
+                f.seek(-1, os.SEEK_CUR)
+                continue
+            if code == 0x01 or 0xD0 <= code <= 0xD7:
+                continue
+            length = f.read(2)
+            if len(length) < 2:
+                return None
+            if code in _SOF_MARKERS:
+                frame = f.read(5)
+                if len(frame) < 5:
+                    return None
+                return int.from_bytes(frame[3:5], 'big'), int.from_bytes(frame[1:3], 'big')
+            f.seek(int.from_bytes(length, 'big') - 2, os.SEEK_CUR)
+
+
+class ImageStore:
+    """LRU-кеш декодированных изображений с ограничением суммарного размера."""
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.nbytes = 0
+        self.decodes = 0
+        self.hits = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def _key(self, path, reduce):
+        st = os.stat(path)
+        return os.path.realpath(path), st.st_mtime_ns, st.st_size, reduce
+
+    def load(self, path, reduce=1):
+        """Изображение path, уменьшенное в reduce раз (1, 2, 4, 8), только для чтения."""
+        if reduce not in REDUCED_FLAGS:
+            raise ValueError('уменьшение должно быть 1, 2, 4 или 8: %r' % reduce)
+        key = self._key(path, reduce)
+        with self._lock:
+            image = self._get(key)
+            if image is not None:
+                return image
+            # Один файл декодирует один поток, остальные ждут его результата
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._lock:
+                image = self._get(key)
+                if image is not None:
+                    return image
+            with span('decode', path=os.path.basename(path), reduce=reduce):
+                image = cv2.imread(path, REDUCED_FLAGS[reduce])
+            with self._lock:
+                self._loading.pop(key, None)
+                if image is None:
+                    raise ValueError('не удалось прочитать изображение: %s' % path)
+                self.decodes += 1
+                image.setflags(write=False)
+                self._put(key, image)
+        return image
+
+    def preview(self, path, max_side=PROXY_SIDE):
+        """
+        Изображение для показа с длинной стороной не меньше max_side
+        (или полное, если оно меньше): уже декодированное полное
+        изображение, иначе наибольшее уменьшение при декодировании JPEG.
+        """
+        full = self.cached(path)
+        if full is not None:
+            return full
+        size = jpeg_size(path)
+        if size is not None:
+            for reduce in (8, 4, 2):
+                if max(size) // reduce >= max_side:
+                    return self.load(path, reduce)
+        return self.load(path)
+
+    def cached(self, path, reduce=1):
+        """Изображение из кеша без декодирования или None."""
+        key = self._key(path, reduce)
+        with self._lock:
+            return self._get(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def _get(self, key):
+        image = self._items.get(key)
+        if image is not None:
+            self._items.move_to_end(key)
+            self.hits += 1
+        return image
+
+    def _put(self, key, image):
+        if image.nbytes > self.budget:
+            return
+        self._items[key] = image
+        self.nbytes += image.nbytes
+        while self.nbytes > self.budget:
+            _, evicted = self._items.popitem(last=False)
+            self.nbytes -= evicted.nbytes
@@ -0,0 +1,85 @@
+"""
+Виджет предпросмотра изображений cv2 для вкладок лабораторной 2.
+
+PreviewLabel перерисовывается только при смене изображения или размера
+виджета. Массив BGR или оттенков серого передается в QImage без
+преобразования цвета (Format_BGR888 / Format_Grayscale8), а
+масштабирование идет от ближайшего уровня кешированной пирамиды, так что
+большой снимок не пережимается целиком при каждом обновлении.
+"""
+import cv2
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QLabel, QSizePolicy
+
+from profiler import span
+
+
+class PreviewLabel(QLabel):
+    """QLabel, показывающий массив cv2 вписанным в свой размер."""
+
+    def __init__(self, text, parent=None):
+        super().__init__(text, parent)
+        self.setAlignment(Qt.AlignCenter)
+        self.setMinimumSize(600, 400)
+        self.setStyleSheet("border: 1px solid black;")
+        # Размер задает компоновка, а не pixmap: иначе перерисовка меняла бы размер
+        self.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        self._image = None
+        self._levels = []
+        self._rendered_size = None
+        self.render_count = 0
+
+    def set_image(self, image):
+        """Показывает image; тот же объект повторно не перерисовывается."""
+        if image is self._image:
+            return
+        self._image = image
+        self._levels = [] if image is None else [np.ascontiguousarray(image)]
+        self._rendered_size = None
+        if image is None:
+            self.clear()
+        else:
+            self._render()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._render()
+
+    def _level(self, w, h):
+        """Наименьший уровень пирамиды, не меньший w x h (уровни строятся по требованию)."""
+        levels = self._levels
+        while True:
+            top = levels[-1]
+            lh, lw = top.shape[:2]
+            if lw < 2 * w or lh < 2 * h or min(lw, lh) < 2:
+                return top
+            levels.append(cv2.pyrDown(top))
+
+    def _render(self):
+        if self._image is None:
+            return
+        size = (self.width(), self.height())
+        if size == self._rendered_size:
+            return
+        self._rendered_size = size
+
+        ih, iw = self._image.shape[:2]
+        scale = min(size[0] / iw, size[1] / ih)
+        w, h = max(1, round(iw * scale)), max(1, round(ih * scale))
+        with span('display.pyramid'):
+            level = self._level(w, h)
+        if level.shape[1] == w and level.shape[0] == h:
+            fitted = level
+        else:
+            interpolation = cv2.INTER_AREA if level.shape[1] > w else cv2.INTER_LINEAR
+            with span('display.resize', width=w, height=h):
+                fitted = cv2.resize(level, (w, h), interpolation=interpolation)
+
+        fmt = QImage.Format_BGR888 if fitted.ndim == 3 else QImage.Format_Grayscale8
+        with span('display.pixmap'):
+            qimage = QImage(fitted.data, w, h, fitted.strides[0], fmt)
+            # fromImage копирует пиксели, поэтому fitted может быть освобожден
+            self.setPixmap(QPixmap.fromImage(qimage))
+        self.render_count += 1
@@ -1,6 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, colorchooser
-import colorsys
+import time
+import numpy as np
+
+import colour_engine
+from colour_engine import SPACES, convert, convert_many
+from palette import DEFAULT_PALETTE, PaletteIndex
 
 
 def clamp(x, a, b):
@@ -9,76 +14,118 @@ def clamp(x, a, b):
 
 def rgb_to_cmyk(r, g, b):
     """Конвертирует RGB (0-255) в CMYK (%)."""
-    if (r, g, b) == (0, 0, 0):
-        return 0.0, 0.0, 0.0, 100.0
-    r_p, g_p, b_p = r / 255.0, g / 255.0, b / 255.0
-    k = 1 - max(r_p, g_p, b_p)
-    if k == 1.0:
-        return 0.0, 0.0, 0.0, 100.0
-
-    c = (1 - r_p - k) / (1 - k)
-    m = (1 - g_p - k) / (1 - k)
-    y = (1 - b_p - k) / (1 - k)
-    return round(c * 100, 2), round(m * 100, 2), round(y * 100, 2), round(k * 100, 2)
+    return colour_engine.rgb_to_cmyk(r, g, b)
 
 
 def cmyk_to_rgb(c, m, y, k):
     """Конвертирует CMYK (%) в RGB (0-255)."""
-    c_p, m_p, y_p, k_p = c / 100.0, m / 100.0, y / 100.0, k / 100.0
-    r = 255 * (1 - c_p) * (1 - k_p)
-    g = 255 * (1 - m_p) * (1 - k_p)
-    b = 255 * (1 - y_p) * (1 - k_p)
-    return int(round(clamp(r, 0, 255))), int(round(clamp(g, 0, 255))), int(round(clamp(b, 0, 255)))
+    return colour_engine.cmyk_to_rgb(c, m, y, k)
 
 
 def rgb_to_hsv_vals(r, g, b):
     """
     Конвертирует RGB (0-255) в HSV (H: 0-360, S: 0-100, V: 0-100).  
     """
-    r_p, g_p, b_p = r / 255.0, g / 255.0, b / 255.0
-    h, s, v = colorsys.rgb_to_hsv(r_p, g_p, b_p)
-    return round(h * 360, 2), round(s * 100, 2), round(v * 100, 2)
+    return colour_engine.rgb_to_hsv(r, g, b)
 
 
 def hsv_to_rgb_vals(h, s, v):
     """
     Конвертирует HSV (H: 0-360, S: 0-100, V: 0-100) в RGB (0-255).
     """
-    h_p, s_p, v_p = (h % 360) / 360.0, s / 100.0, v / 100.0
-    r_p, g_p, b_p = colorsys.hsv_to_rgb(h_p, s_p, v_p)
-    
-    r = r_p * 255
-    g = g_p * 255
-    b = b_p * 255
+    return colour_engine.hsv_to_rgb(h, s, v)
+
+
+# Размеры пипетки: плоскость S/V и полоса тона под ней
+PLANE = 360
+HUE_STRIP = 20
+HUE_TOP = PLANE + 6
+SWATCH_TOP = HUE_TOP + HUE_STRIP + 6
+
+
+def sv_plane_rgb(hue, size=PLANE):
+    """Плоскость (size, size, 3) uint8: S растет слева направо, V -- снизу вверх."""
+    pure = convert(np.array((hue, 100.0, 100.0)), 'hsv', 'rgb').astype(np.float32) / 255
+    s = np.linspace(0, 1, size, dtype=np.float32)
+    v = np.linspace(255, 0, size, dtype=np.float32)
+    # HSV при фиксированном тоне: v * ((1 - s) * белый + s * чистый тон)
+    row = 1 - s[:, None] * (1 - pure[None, :])
+    return (v[:, None, None] * row[None, :, :] + 0.5).astype(np.uint8)
+
+
+def hue_strip_rgb(width=PLANE, height=HUE_STRIP):
+    """Полоса тонов 0..360 при S = V = 100."""
+    hues = np.linspace(0, 360, width, endpoint=False)
+    hsv = np.column_stack([hues, np.full(width, 100.0), np.full(width, 100.0)])
+    row = convert(hsv, 'hsv', 'rgb', quantize=True)
+    return np.broadcast_to(row, (height, width, 3))
+
 
-    return (
-        int(round(clamp(r, 0, 255))),
-        int(round(clamp(g, 0, 255))),
-        int(round(clamp(b, 0, 255)))
-    )
+def put_rgb(photo, rgb):
+    """Загружает массив RGB в tk.PhotoImage одним вызовом (через двоичный PPM)."""
+    h, w = rgb.shape[:2]
+    ppm = b'P6 %d %d 255 ' % (w, h) + np.ascontiguousarray(rgb, dtype=np.uint8).tobytes()
+    photo.tk.call(photo, 'put', ppm, '-format', 'ppm')
+
+
+# Панели интерфейса: пространство движка и заголовок группы
+PANELS = [
+    ('rgb', 'RGB — 0..255'),
+    ('cmyk', 'CMYK — %'),
+    ('hsv', 'HSV — H:0..360 S/V:0..100'),
+    ('hsl', 'HSL — H:0..360 S/L:0..100'),
+    ('lab', 'CIELAB — L:0..100 a/b:-128..127'),
+]
 
 
 class ColourConverterApp(tk.Tk):
     def __init__(self):
         super().__init__()
-        self.title('Лабораторная 1 — RGB / CMYK / HSV')
-        self.geometry('1200x520')
+        self.title('Лабораторная 1 — RGB / CMYK / HSV / HSL / Lab')
+        self.geometry('1200x600')
         self.resizable(False, False)
 
         self.updating = False
 
-        self.rgb = (255, 0, 0) #храним только rgb
+        # Цвет хранится в пространстве последней правки без округления;
+        # rgb -- его 8-битный образ для образца, HEX и палитры
+        self.source = ('rgb', (255.0, 0.0, 0.0))
+        self.rgb = (255, 0, 0)
+
+        # Планировщик перерисовки: события слайдеров между кадрами
+        # сливаются в одно обновление через after_idle
+        self._refresh_job = None
+        self._shown = {}  # последние записанные в виджеты значения
+        self.refresh_count = 0
+        self.dropped_events = 0
+        self._stats_count = 0
+        self.plane_render_ms = 0.0
+        self.picker_hue = 0.0  # тон плоскости; для серых цветов сохраняется прежний
 
         self._build_ui()
-        self._sync_all_from_rgb()
+        self._sync_all()
+        self.after(1000, self._report_stats)
 
     def _build_ui(self):
         pad = 10
         left = ttk.Frame(self, padding=pad)
         left.pack(side='left', fill='y')
 
-        self.display = tk.Canvas(left, width=360, height=360, bd=2, relief='sunken')
+        self.display = tk.Canvas(left, width=PLANE, height=SWATCH_TOP + 36, bd=2, relief='sunken')
         self.display.grid(row=0, column=0, padx=pad, pady=pad)
+        # Плоскость и полоса тона -- изображения, заполняемые целиком из NumPy
+        self.plane_photo = tk.PhotoImage(width=PLANE, height=PLANE)
+        self.display.create_image(0, 0, image=self.plane_photo, anchor='nw')
+        self.hue_photo = tk.PhotoImage(width=PLANE, height=HUE_STRIP)
+        self.display.create_image(0, HUE_TOP, image=self.hue_photo, anchor='nw')
+        put_rgb(self.hue_photo, hue_strip_rgb())
+        self.plane_marker = self.display.create_oval(0, 0, 0, 0, outline='white', width=2)
+        self.hue_marker = self.display.create_rectangle(0, HUE_TOP, 0, HUE_TOP + HUE_STRIP,
+                                                        outline='black', width=2)
+        self.display_rect = self.display.create_rectangle(0, SWATCH_TOP, PLANE, SWATCH_TOP + 36,
+                                                          outline='')
+        self.display.bind('<Button-1>', self._on_picker)
+        self.display.bind('<B1-Motion>', self._on_picker)
 
         btns_frame = ttk.Frame(left)
         btns_frame.grid(row=1, column=0, pady=(0, pad))
@@ -89,28 +136,23 @@ class ColourConverterApp(tk.Tk):
         palette_frame = ttk.LabelFrame(left, text='Palette', padding=6)
         palette_frame.grid(row=2, column=0, sticky='we', pady=(0, pad))
 
-        base_colours = ['#ffffff', '#000000', '#ff0000', '#00ff00', '#0000ff',
-                        '#ffff00', '#ff00ff', '#00ffff', '#808080', '#c08040']
-        for i, hexc in enumerate(base_colours):
+        # Ближайший к текущему цвет палитры отмечается вдавленной кнопкой
+        self.palette_index = PaletteIndex(DEFAULT_PALETTE)
+        self.palette_buttons = []
+        for i, hexc in enumerate(DEFAULT_PALETTE):
             b = tk.Button(palette_frame, bg=hexc, width=3, height=1, command=lambda h=hexc: self._set_from_hex(h))
             b.grid(row=0, column=i, padx=2)
+            self.palette_buttons.append(b)
 
         right = ttk.Frame(self, padding=pad)
         right.pack(side='right', fill='both', expand=True)
 
         self.vars = {}
 
-        group_rgb = ttk.LabelFrame(right, text='RGB — 0..255', padding=8)
-        group_rgb.pack(fill='x', pady=6)
-        self._make_rgb_controls(group_rgb)
-
-        group_cmyk = ttk.LabelFrame(right, text='CMYK — %', padding=8)
-        group_cmyk.pack(fill='x', pady=6)
-        self._make_cmyk_controls(group_cmyk)
-
-        group_hsv = ttk.LabelFrame(right, text='HSV — H:0..360 S/V:0..100', padding=8)
-        group_hsv.pack(fill='x', pady=6)
-        self._make_hsv_controls(group_hsv)
+        for space, title in PANELS:
+            group = ttk.LabelFrame(right, text=title, padding=8)
+            group.pack(fill='x', pady=6)
+            self._make_controls(group, space)
 
         hex_frame = ttk.Frame(right)
         hex_frame.pack(fill='x', pady=8)
@@ -121,186 +163,178 @@ class ColourConverterApp(tk.Tk):
         self.hex_entry.bind('<Return>', lambda e: self._set_from_hex(self.hex_var.get()))
         self.hex_entry.bind('<FocusOut>', lambda e: self._set_from_hex(self.hex_var.get()))
 
-    def _make_rgb_controls(self, parent):
-        frm = ttk.Frame(parent)
-        frm.pack(fill='x')
-        for i, comp in enumerate(['R', 'G', 'B']):
-            v = tk.IntVar(value=0)
-            self.vars[f'rgb_{comp}'] = v
-            lbl = ttk.Label(frm, text=comp)
-            lbl.grid(row=0, column=i * 3, padx=(0, 4))
-            ent = ttk.Entry(frm, textvariable=v, width=6)
-            ent.grid(row=0, column=i * 3 + 1)
-            ent.bind('<Return>', lambda e, c=comp: self._on_rgb_entry(c))
-            ent.bind('<FocusOut>', lambda e, c=comp: self._on_rgb_entry(c))
-            s = ttk.Scale(frm, from_=0, to=255, orient='horizontal', command=lambda val, c=comp: self._on_rgb_slider(c, val))
-            s.grid(row=0, column=i * 3 + 2, padx=(6, 12), sticky='we')
-            self.vars[f'rgb_{comp}_scale'] = s
-
-    def _make_cmyk_controls(self, parent):
-        frm = ttk.Frame(parent)
-        frm.pack(fill='x')
-        for i, comp in enumerate(['C', 'M', 'Y', 'K']):
-            v = tk.DoubleVar(value=0.0)
-            self.vars[f'cmyk_{comp}'] = v
-            lbl = ttk.Label(frm, text=comp)
-            lbl.grid(row=0, column=i * 3, padx=(0, 4))
-            ent = ttk.Entry(frm, textvariable=v, width=6)
-            ent.grid(row=0, column=i * 3 + 1)
-            ent.bind('<Return>', lambda e, c=comp: self._on_cmyk_entry(c))
-            ent.bind('<FocusOut>', lambda e, c=comp: self._on_cmyk_entry(c))
-            s = ttk.Scale(frm, from_=0, to=100, orient='horizontal', command=lambda val, c=comp: self._on_cmyk_slider(c, val))
-            s.grid(row=0, column=i * 3 + 2, padx=(6, 12), sticky='we')
-            self.vars[f'cmyk_{comp}_scale'] = s
+        self.stats_var = tk.StringVar()
+        ttk.Label(right, textvariable=self.stats_var, foreground='gray').pack(anchor='w', pady=(4, 0))
 
-    def _make_hsv_controls(self, parent):
-        """Создает элементы управления для HSV."""
+    def _make_controls(self, parent, space):
+        """Создает поля и слайдеры для всех каналов пространства."""
         frm = ttk.Frame(parent)
         frm.pack(fill='x')
-        for i, comp in enumerate(['H', 'S', 'V']): 
-            if comp == 'H':
-                v = tk.DoubleVar(value=0.0)
-                to = 360
-            else:
-                v = tk.DoubleVar(value=0.0)
-                to = 100
-            
-            self.vars[f'hsv_{comp}'] = v
+        channels, ranges = SPACES[space]
+        for i, (comp, (lo, hi)) in enumerate(zip(channels, ranges)):
+            v = tk.IntVar(value=0) if space == 'rgb' else tk.DoubleVar(value=0.0)
+            self.vars[f'{space}_{comp}'] = v
             lbl = ttk.Label(frm, text=comp)
             lbl.grid(row=0, column=i * 3, padx=(0, 4))
             ent = ttk.Entry(frm, textvariable=v, width=6)
             ent.grid(row=0, column=i * 3 + 1)
-            ent.bind('<Return>', lambda e, c=comp: self._on_hsv_entry(c)) 
-            ent.bind('<FocusOut>', lambda e, c=comp: self._on_hsv_entry(c)) 
-            s = ttk.Scale(frm, from_=0, to=to, orient='horizontal', command=lambda val, c=comp: self._on_hsv_slider(c, val))
+            ent.bind('<Return>', lambda e, sp=space, c=comp: self._on_entry(sp, c))
+            ent.bind('<FocusOut>', lambda e, sp=space, c=comp: self._on_entry(sp, c))
+            s = ttk.Scale(frm, from_=lo, to=hi, orient='horizontal',
+                          command=lambda val, sp=space, c=comp: self._on_slider(sp, c, val))
             s.grid(row=0, column=i * 3 + 2, padx=(6, 12), sticky='we')
-            self.vars[f'hsv_{comp}_scale'] = s 
+            self.vars[f'{space}_{comp}_scale'] = s
 
-
-    def _on_rgb_entry(self, comp):
+    def _on_entry(self, space, comp):
         try:
-            v = int(self.vars[f'rgb_{comp}'].get())
-        except Exception:
-            return
-        v = int(clamp(v, 0, 255))
-        self._update_rgb_component(comp, v)
-
-    def _on_rgb_slider(self, comp, val):
-        v = int(round(float(val)))
-        self.vars[f'rgb_{comp}'].set(v)
-        self._update_rgb_component(comp, v)
-
-    def _on_cmyk_entry(self, comp):
-        try:
-            v = float(self.vars[f'cmyk_{comp}'].get())
-        except Exception:
-            return
-        v = clamp(v, 0.0, 100.0)
-        self._update_cmyk_component(comp, v)
-
-    def _on_cmyk_slider(self, comp, val):
-        v = round(float(val), 2)
-        self.vars[f'cmyk_{comp}'].set(v)
-        self._update_cmyk_component(comp, v)
-
-    def _on_hsv_entry(self, comp):
-        """Обработчик ввода для HSV."""
-        try:
-            v = float(self.vars[f'hsv_{comp}'].get()) 
+            v = float(self.vars[f'{space}_{comp}'].get())
         except Exception:
             return
+        channels, ranges = SPACES[space]
+        lo, hi = ranges[channels.index(comp)]
         if comp == 'H':
             v = v % 360
+        elif space == 'rgb':
+            v = int(clamp(v, lo, hi))
         else:
-            v = clamp(v, 0.0, 100.0)
-        self._update_hsv_component(comp, v)
-
-    def _on_hsv_slider(self, comp, val):
-        """Обработчик слайдера для HSV."""
-        v = round(float(val), 2)
-        self.vars[f'hsv_{comp}'].set(v) 
-        self._update_hsv_component(comp, v) 
-
+            v = clamp(v, lo, hi)
+        if self._shown.get(f'{space}_{comp}') == v:
+            # Значение не менялось (например, уход фокуса): источник сохраняет точность
+            return
+        self._forget_shown(f'{space}_{comp}')
+        self._update_component(space, comp, v)
 
-    def _update_rgb_component(self, comp, value):
+    def _on_slider(self, space, comp, val):
         if self.updating:
             return
-        self.updating = True
-        r, g, b = self.rgb
-        if comp == 'R':
-            r = value
-        elif comp == 'G':
-            g = value
-        else:
-            b = value
-        self.rgb = (r, g, b)
-        self._sync_all_from_rgb()
-        self.updating = False
+        v = int(round(float(val))) if space == 'rgb' else round(float(val), 2)
+        self.vars[f'{space}_{comp}'].set(v)
+        self._forget_shown(f'{space}_{comp}')
+        self._update_component(space, comp, v)
 
-    def _update_cmyk_component(self, comp, value):
+    def _update_component(self, space, comp, value):
+        """Делает источником цвета пространство space с измененным каналом."""
         if self.updating:
             return
-        self.updating = True
-        c = self.vars['cmyk_C'].get() if comp != 'C' else value
-        m = self.vars['cmyk_M'].get() if comp != 'M' else value
-        y = self.vars['cmyk_Y'].get() if comp != 'Y' else value
-        k = self.vars['cmyk_K'].get() if comp != 'K' else value
-        r, g, b = cmyk_to_rgb(float(c), float(m), float(y), float(k))
-        self.rgb = (r, g, b)
-        self._sync_all_from_rgb()
-        self.updating = False
+        if self.source[0] == space:
+            values = list(self.source[1])
+            values[SPACES[space][0].index(comp)] = float(value)
+        else:
+            values = [value if c == comp else float(self.vars[f'{space}_{c}'].get())
+                      for c in SPACES[space][0]]
+        self._set_source(space, values)
+
+    def _set_source(self, space, values):
+        """Новый цвет в пространстве space; панели пересчитываются из него без округления до 8 бит."""
+        self.source = (space, tuple(float(v) for v in values))
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        """Откладывает перерисовку до простоя; повторные события до нее сливаются."""
+        if self._refresh_job is not None:
+            self.dropped_events += 1
+            return
+        self._refresh_job = self.after_idle(self._sync_all)
 
-    def _update_hsv_component(self, comp, value):
-        """Обновляет цвет по компоненту HSV."""
-        if self.updating:
+    def _forget_shown(self, key):
+        """Значение виджета изменил пользователь: следующая перерисовка запишет его заново."""
+        self._shown.pop(key, None)
+        self._shown.pop(f'{key}_scale', None)
+
+    def _show(self, key, value):
+        """Записывает значение в переменную или шкалу, только если оно изменилось."""
+        if self._shown.get(key) == value:
             return
-        self.updating = True
-        h = self.vars['hsv_H'].get() if comp != 'H' else value
-        s = self.vars['hsv_S'].get() if comp != 'S' else value
-        v = self.vars['hsv_V'].get() if comp != 'V' else value 
+        self._shown[key] = value
+        try:
+            self.vars[key].set(value)
+        except Exception:
+            pass
 
-        r, g, b = hsv_to_rgb_vals(float(h), float(s), float(v))
-        self.rgb = (r, g, b)
-        self._sync_all_from_rgb()
-        self.updating = False
+    def _sync_all(self):
+        """Синхронизирует все цветовые модели из цвета-источника."""
+        self._refresh_job = None
+        self.updating = True
+        try:
+            # Все панели -- одним слитым вызовом движка из пространства источника;
+            # округление до точности интерфейса только на выходе
+            space, values = self.source
+            converted = convert_many(np.array(values, dtype=np.float64), space,
+                                     [space for space, _ in PANELS], quantize=True)
+            self.rgb = r, g, b = tuple(converted['rgb'].tolist())
+            hexc = '#%02x%02x%02x' % (r, g, b)
+            if self._shown.get('display') != hexc:
+                self._shown['display'] = hexc
+                self.display.itemconfig(self.display_rect, fill=hexc)
+            if self._shown.get('hex') != hexc:
+                self._shown['hex'] = hexc
+                self.hex_var.set(hexc.upper())
+                nearest = int(self.palette_index.nearest(np.array(self.rgb)))
+                previous = self._shown.get('palette')
+                if previous != nearest:
+                    if previous is not None:
+                        self.palette_buttons[previous].configure(relief='raised')
+                    self.palette_buttons[nearest].configure(relief='sunken')
+                    self._shown['palette'] = nearest
+
+            for space, values in converted.items():
+                for comp, value in zip(SPACES[space][0], values.tolist()):
+                    self._show(f'{space}_{comp}', value)
+                    self._show(f'{space}_{comp}_scale', value)
+            if self.source[0] == 'hsv':
+                # Точные h, s, v источника: тон не восстанавливается из округленных
+                # значений и сохраняется даже при S = 0
+                h, s, v = self.source[1]
+                self.picker_hue = h % 360
+                self._sync_picker(h, s, v)
+            else:
+                self._sync_picker(*converted['hsv'].tolist())
+        finally:
+            self.updating = False
+        self.refresh_count += 1
+
+    def _sync_picker(self, h, s, v):
+        """Перерисовывает плоскость только при смене тона, маркеры -- переносом."""
+        if s > 0:
+            self.picker_hue = h % 360
+        if self._shown.get('plane') != self.picker_hue:
+            self._shown['plane'] = self.picker_hue
+            start = time.perf_counter()
+            put_rgb(self.plane_photo, sv_plane_rgb(self.picker_hue))
+            self.plane_render_ms = (time.perf_counter() - start) * 1000
+        x = s / 100 * (PLANE - 1)
+        y = (1 - v / 100) * (PLANE - 1)
+        self.display.coords(self.plane_marker, x - 5, y - 5, x + 5, y + 5)
+        hx = self.picker_hue / 360 * PLANE
+        self.display.coords(self.hue_marker, hx - 2, HUE_TOP, hx + 2, HUE_TOP + HUE_STRIP)
+
+    def _on_picker(self, event):
+        """Клик или перетаскивание по плоскости S/V или по полосе тона."""
+        x = clamp(self.display.canvasx(event.x), 0, PLANE - 1)
+        y = self.display.canvasy(event.y)
+        if self.source[0] == 'hsv':
+            h, s, v = self.source[1]
+        else:
+            h, s, v = (float(self.vars[f'hsv_{c}'].get()) for c in 'HSV')
+        if y < PLANE:
+            s = x / (PLANE - 1) * 100
+            v = (1 - clamp(y, 0, PLANE - 1) / (PLANE - 1)) * 100
+            h = self.picker_hue
+        elif HUE_TOP <= y < HUE_TOP + HUE_STRIP:
+            h = x / PLANE * 360
+            self.picker_hue = h
+        else:
+            return
+        self._forget_shown('hex')
+        self._set_source('hsv', (h, s, v))
 
-    def _sync_all_from_rgb(self):
-        """Синхронизирует все цветовые модели, используя текущий RGB."""
-        r, g, b = self.rgb
-        hexc = '#%02x%02x%02x' % (r, g, b)
-        self.display.delete('all')
-        self.display.create_rectangle(0, 0, 360, 360, fill=hexc, outline='')
-
-        self.hex_var.set(hexc.upper())
-
-        for i, comp in enumerate(['R', 'G', 'B']):
-            self.vars[f'rgb_{comp}'].set((r, g, b)[i])
-            try:
-                self.vars[f'rgb_{comp}_scale'].set((r, g, b)[i])
-            except Exception:
-                pass
-
-        c, m, y, k = rgb_to_cmyk(r, g, b)
-        self.vars['cmyk_C'].set(c)
-        self.vars['cmyk_M'].set(m)
-        self.vars['cmyk_Y'].set(y)
-        self.vars['cmyk_K'].set(k)
-        for comp in ['C', 'M', 'Y', 'K']:
-            try:
-                self.vars[f'cmyk_{comp}_scale'].set(self.vars[f'cmyk_{comp}'].get())
-            except Exception:
-                pass
-
-        h, s, v = rgb_to_hsv_vals(r, g, b)
-        self.vars['hsv_H'].set(h)
-        self.vars['hsv_S'].set(s)
-        self.vars['hsv_V'].set(v)
-        
-        for comp in ['H', 'S', 'V']: 
-            try:
-                self.vars[f'hsv_{comp}_scale'].set(self.vars[f'hsv_{comp}'].get())
-            except Exception:
-                pass
+    def _report_stats(self):
+        """Раз в секунду выводит частоту перерисовок и число слитых событий."""
+        rate = self.refresh_count - self._stats_count
+        self._stats_count = self.refresh_count
+        self.stats_var.set(f'Обновлений/с: {rate}   слито событий: {self.dropped_events}   '
+                           f'плоскость S/V: {self.plane_render_ms:.1f} мс')
+        self.after(1000, self._report_stats)
 
     def _choose_colour(self):
         hexc, _ = colorchooser.askcolor(color=self.hex_var.get(), parent=self)
@@ -332,10 +366,11 @@ class ColourConverterApp(tk.Tk):
             return
         if self.updating:
             return
-        self.updating = True
-        self.rgb = (r, g, b)
-        self._sync_all_from_rgb()
-        self.updating = False
+        self._forget_shown('hex')
+        if (r, g, b) == self.rgb:
+            self._schedule_refresh()
+            return
+        self._set_source('rgb', (r, g, b))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,923 @@
+"""
+Окно лабораторной 2 (PyQt5): вкладки морфологии, резкости и видео.
+
+Вся обработка -- в модулях без Qt (image_ops, morph_pipeline, tiled_ops,
+video_ops); этот модуль импортируется только при запуске интерфейса
+(python lab2.py) или при обращении к классам вкладок через lab2.
+"""
+import os
+import sys
+import threading
+from functools import partial
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
+                             QHBoxLayout, QPushButton, QComboBox, QLabel,
+                             QFileDialog, QSpinBox, QDoubleSpinBox, QGroupBox, QTabWidget,
+                             QSlider, QListWidget, QCheckBox, QAction, QActionGroup)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+
+from batch_lab2 import save_recipe
+from history import History
+from image_store import ImageStore
+from image_ops import FastSharpener, get_kernel, make_proxy, scale_kernel, sharpen
+from morph_pipeline import MorphPipeline, Step
+from parallel_ops import EXEC_MODES, EXECUTION
+from profiler import PROFILER
+from image_view import PreviewLabel
+from task_runner import BusyIndicator, TaskRunner
+from tiled_ops import Sharpen
+from video_ops import StreamStats, open_writer, run_stream
+
+# Подписи интерфейса -> имена image_ops
+SHAPE_NAMES = {"Прямоугольник": "rect", "Эллипс": "ellipse", "Крест": "cross"}
+OP_TITLES = {
+    "erode": "Эрозия",
+    "dilate": "Дилатация",
+    "open": "Размыкание",
+    "close": "Замыкание",
+    "gradient": "Морфологический градиент",
+}
+SHARPEN_NAMES = {"Лапласиан": "laplacian", "Лапласиан Гауссиана (LoG)": "log"}
+# Префикс имени задач живого просмотра (считаются на уменьшенной копии)
+PREVIEW = "Просмотр"
+# Имена задач восстановления из истории: в историю повторно не записываются
+UNDO = "Отмена"
+REDO = "Повтор"
+# Имя задачи полного декодирования загружаемого файла
+LOAD = "Загрузка"
+
+# Морфологическая оброботка
+
+class MorphologyTab(QWidget):
+    """
+    Вкладка для демонстрации морфологической обработки изображений.
+    """
+    def __init__(self, store=None):
+        super().__init__()
+        self.original_image = None
+        self.processed_image = None
+        # Декодированные файлы общие для всех вкладок
+        self.store = store if store is not None else ImageStore()
+        # Операции не изменяют изображение, а добавляются в цепочку шагов
+        self.pipeline = MorphPipeline()
+        # Та же цепочка на уменьшенной копии для живого просмотра
+        self.proxy_pipeline = MorphPipeline()
+        self.proxy_factor = 1.0
+        # Состояние -- список шагов: результат восстанавливается пересчетом через кеш цепочки
+        self.history = History()
+        self.runner = TaskRunner(self)
+        self.runner.finished.connect(self.show_result)
+        self.initUI()
+        
+    def initUI(self):
+        main_layout = QHBoxLayout()
+        self.setLayout(main_layout)
+        
+        left_panel = QVBoxLayout()
+        
+        load_group = QGroupBox("Загрузка изображения")
+        load_layout = QVBoxLayout()
+        self.load_btn = QPushButton("Загрузить изображение")
+        self.load_btn.clicked.connect(self.load_image)
+        load_layout.addWidget(self.load_btn)
+        load_group.setLayout(load_layout)
+        left_panel.addWidget(load_group)
+        
+        params_group = QGroupBox("Параметры ядра")
+        params_layout = QVBoxLayout()
+        
+        params_layout.addWidget(QLabel("Структурирующий элемент:"))
+        self.struct_element_combo = QComboBox()
+        self.struct_element_combo.addItems(["Прямоугольник", "Эллипс", "Крест"])
+        params_layout.addWidget(self.struct_element_combo)
+        
+        params_layout.addWidget(QLabel("Размер ядра (нечетный):"))
+        self.kernel_size_spin = QSpinBox()
+        self.kernel_size_spin.setMinimum(3)
+        self.kernel_size_spin.setMaximum(31)
+        self.kernel_size_spin.setSingleStep(2)
+        self.kernel_size_spin.setValue(5)
+        params_layout.addWidget(self.kernel_size_spin)
+        
+        params_layout.addWidget(QLabel("Количество итераций:"))
+        self.iterations_spin = QSpinBox()
+        self.iterations_spin.setMinimum(1)
+        self.iterations_spin.setMaximum(10)
+        self.iterations_spin.setValue(1)
+        params_layout.addWidget(self.iterations_spin)
+        
+        self.live_check = QCheckBox("Живой просмотр выбранного шага")
+        params_layout.addWidget(self.live_check)
+        self.struct_element_combo.currentIndexChanged.connect(self.live_preview)
+        self.kernel_size_spin.valueChanged.connect(self.live_preview)
+        self.iterations_spin.valueChanged.connect(self.live_preview)
+        
+        params_group.setLayout(params_layout)
+        left_panel.addWidget(params_group)
+        
+        operations_group = QGroupBox("Морфологические операции")
+        operations_layout = QVBoxLayout()
+        
+        self.erosion_btn = QPushButton("Эрозия")
+        self.erosion_btn.clicked.connect(self.apply_erosion)
+        operations_layout.addWidget(self.erosion_btn)
+        
+        self.dilation_btn = QPushButton("Дилатация")
+        self.dilation_btn.clicked.connect(self.apply_dilation)
+        operations_layout.addWidget(self.dilation_btn)
+        
+        self.opening_btn = QPushButton("Размыкание")
+        self.opening_btn.clicked.connect(self.apply_opening)
+        operations_layout.addWidget(self.opening_btn)
+        
+        self.closing_btn = QPushButton("Замыкание")
+        self.closing_btn.clicked.connect(self.apply_closing)
+        operations_layout.addWidget(self.closing_btn)
+        
+        self.gradient_btn = QPushButton("Морфологический градиент")
+        self.gradient_btn.clicked.connect(self.apply_gradient)
+        operations_layout.addWidget(self.gradient_btn)
+        
+        self.reset_btn = QPushButton("Сброс")
+        self.reset_btn.clicked.connect(self.reset_image)
+        operations_layout.addWidget(self.reset_btn)
+        
+        operations_group.setLayout(operations_layout)
+        left_panel.addWidget(operations_group)
+        
+        steps_group = QGroupBox("Цепочка операций")
+        steps_layout = QVBoxLayout()
+        self.steps_list = QListWidget()
+        self.steps_list.currentRowChanged.connect(self.select_step)
+        steps_layout.addWidget(self.steps_list)
+        
+        self.update_step_btn = QPushButton("Изменить выбранный шаг")
+        self.update_step_btn.clicked.connect(self.update_step)
+        steps_layout.addWidget(self.update_step_btn)
+        
+        self.remove_step_btn = QPushButton("Удалить выбранный шаг")
+        self.remove_step_btn.clicked.connect(self.remove_step)
+        steps_layout.addWidget(self.remove_step_btn)
+        
+        history_layout = QHBoxLayout()
+        self.undo_btn = QPushButton("Отменить")
+        self.undo_btn.setShortcut("Ctrl+Z")
+        self.undo_btn.clicked.connect(self.undo)
+        history_layout.addWidget(self.undo_btn)
+        self.redo_btn = QPushButton("Повторить")
+        self.redo_btn.setShortcut("Ctrl+Shift+Z")
+        self.redo_btn.clicked.connect(self.redo)
+        history_layout.addWidget(self.redo_btn)
+        steps_layout.addLayout(history_layout)
+        self.update_history_buttons()
+        
+        self.save_recipe_btn = QPushButton("Сохранить рецепт")
+        self.save_recipe_btn.clicked.connect(self.save_recipe)
+        steps_layout.addWidget(self.save_recipe_btn)
+        
+        self.pipeline_label = QLabel()
+        steps_layout.addWidget(self.pipeline_label)
+        steps_group.setLayout(steps_layout)
+        left_panel.addWidget(steps_group)
+        
+        left_panel.addWidget(BusyIndicator(self.runner))
+        
+        left_panel.addStretch()
+        
+        right_panel = QVBoxLayout()
+        
+        self.original_label = PreviewLabel("Оригинальное изображение")
+        right_panel.addWidget(self.original_label)
+        
+        self.processed_label = PreviewLabel("Обработанное изображение")
+        right_panel.addWidget(self.processed_label)
+        
+        main_layout.addLayout(left_panel)
+        main_layout.addLayout(right_panel)
+        
+    def load_image(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Выберите изображение", "", 
+            "Images (*.png *.jpg *.jpeg *.bmp *.tiff)"
+        )
+        
+        if file_path:
+            try:
+                preview = self.store.preview(file_path)
+            except (OSError, ValueError):
+                return
+            # Пока файл декодируется целиком, показывается уменьшенная копия;
+            # цепочка прежнего изображения к новому не применяется
+            self.original_image = None
+            self.pipeline.set_source(None)
+            self.pipeline.clear()
+            self.steps_list.clear()
+            self.proxy_pipeline.set_source(None)
+            self.original_label.set_image(preview)
+            self.runner.submit(LOAD, self.store.load, file_path)
+    
+    def set_original(self, image):
+        """Новое исходное изображение (только для чтения, общее с другими вкладками)."""
+        self.original_image = image
+        self.pipeline.set_source(image)
+        proxy, self.proxy_factor = make_proxy(image)
+        self.proxy_pipeline.set_source(proxy)
+        self.pipeline.clear()
+        self.history.clear()
+        self.run_pipeline()
+    
+    def get_kernel(self):
+        """Возвращает структурирующий элемент для морфологических операций."""
+        step = self.current_step("erode")
+        return get_kernel(step.shape, step.size)
+    
+    def current_step(self, op):
+        """Шаг цепочки с текущими параметрами ядра."""
+        return Step(op, SHAPE_NAMES[self.struct_element_combo.currentText()],
+                    self.kernel_size_spin.value(), self.iterations_spin.value())
+    
+    def add_step(self, op):
+        if self.original_image is not None:
+            self.pipeline.append(self.current_step(op))
+            self.run_pipeline(select=len(self.pipeline.steps) - 1)
+    
+    def apply_erosion(self):
+        self.add_step("erode")
+    
+    def apply_dilation(self):
+        self.add_step("dilate")
+    
+    def apply_opening(self):
+        self.add_step("open")
+    
+    def apply_closing(self):
+        self.add_step("close")
+    
+    def apply_gradient(self):
+        self.add_step("gradient")
+    
+    def select_step(self, row):
+        """Переносит параметры выбранного шага в элементы управления."""
+        if not 0 <= row < len(self.pipeline.steps):
+            return
+        step = self.pipeline.steps[row]
+        shapes = {name: title for title, name in SHAPE_NAMES.items()}
+        controls = (self.struct_element_combo, self.kernel_size_spin, self.iterations_spin)
+        # Загрузка параметров шага -- не их изменение: живой просмотр не нужен
+        for control in controls:
+            control.blockSignals(True)
+        self.struct_element_combo.setCurrentText(shapes[step.shape])
+        self.kernel_size_spin.setValue(step.size)
+        self.iterations_spin.setValue(step.iterations)
+        for control in controls:
+            control.blockSignals(False)
+    
+    def live_preview(self):
+        """
+        Пересчитывает цепочку с новыми параметрами выбранного шага на
+        уменьшенной копии (ядра масштабируются вместе с ней). Полное
+        разрешение считается по кнопке «Изменить выбранный шаг».
+        """
+        row = self.steps_list.currentRow()
+        if (not self.live_check.isChecked() or self.proxy_pipeline.source is None
+                or not 0 <= row < len(self.pipeline.steps)):
+            return
+        steps = list(self.pipeline.steps)
+        steps[row] = self.current_step(steps[row].op)
+        source, source_id, _ = self.proxy_pipeline.snapshot()
+        scaled = tuple(step.scaled(self.proxy_factor) for step in steps)
+        self.runner.submit("%s: %s" % (PREVIEW, OP_TITLES[steps[row].op]),
+                           self.proxy_pipeline.compute, source, source_id, scaled,
+                           cancellable=True)
+    
+    def update_step(self):
+        """Заменяет параметры выбранного шага; пересчитываются шаги начиная с него."""
+        row = self.steps_list.currentRow()
+        if 0 <= row < len(self.pipeline.steps):
+            self.pipeline.replace(row, self.current_step(self.pipeline.steps[row].op))
+            self.run_pipeline(select=row)
+    
+    def remove_step(self):
+        row = self.steps_list.currentRow()
+        if 0 <= row < len(self.pipeline.steps):
+            self.pipeline.remove(row)
+            self.run_pipeline(select=min(row, len(self.pipeline.steps) - 1))
+    
+    def save_recipe(self):
+        """Сохраняет цепочку для пакетной обработки (batch_lab2.py)."""
+        if not self.pipeline.steps:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить рецепт", "recipe.json", "Рецепт (*.json)")
+        if file_path:
+            save_recipe(file_path, self.pipeline.steps)
+    
+    def reset_image(self):
+        if self.original_image is not None:
+            self.pipeline.clear()
+            self.run_pipeline()
+    
+    def undo(self):
+        self.restore(self.history.undo())
+    
+    def redo(self):
+        self.restore(self.history.redo())
+    
+    def restore(self, entry):
+        """Возвращает цепочку к записи истории; готовые стадии берутся из кеша."""
+        if entry is None:
+            return
+        steps, select = entry.state
+        self.pipeline.steps = list(steps)
+        self.run_pipeline(select=select, record=False)
+    
+    def update_history_buttons(self):
+        self.undo_btn.setEnabled(self.history.can_undo)
+        self.redo_btn.setEnabled(self.history.can_redo)
+    
+    def run_pipeline(self, select=None, record=True):
+        """
+        Обновляет список шагов и запускает пересчет цепочки в фоне.
+        С record=True новое состояние цепочки записывается в историю.
+        """
+        if record:
+            self.history.push((tuple(self.pipeline.steps), select))
+        self.update_history_buttons()
+        if self.pipeline.source is not None:
+            steps = self.pipeline.steps
+            name = OP_TITLES[steps[-1].op] if steps else "Исходное изображение"
+            self.runner.submit(name, self.pipeline.compute, *self.pipeline.snapshot(),
+                               cancellable=True)
+        
+        self.steps_list.blockSignals(True)
+        self.steps_list.clear()
+        for i, step in enumerate(self.pipeline.steps, 1):
+            text = "%d. %s, %s %dx%d" % (i, OP_TITLES[step.op], step.shape, step.size, step.size)
+            if step.op in ("erode", "dilate"):
+                text += ", итераций: %d" % step.iterations
+            self.steps_list.addItem(text)
+        if select is not None and select >= 0:
+            self.steps_list.setCurrentRow(select)
+        self.steps_list.blockSignals(False)
+    
+    def show_result(self, name, image, compute_s, latency_s):
+        if name == LOAD:
+            self.set_original(image)
+            return
+        self.processed_image = image
+        if name.startswith(PREVIEW):
+            self.display_images()
+            return
+        cache = self.pipeline.cache
+        text = "Пересчитано шагов: %d из %d\nКеш: %d стадий, %.1f МБ" % (
+            self.pipeline.last_computed, len(self.pipeline.steps),
+            len(cache), cache.nbytes / (1 << 20))
+        if self.pipeline.packed is not None:
+            text += "\nБинарная маска: упакованная морфология"
+        self.pipeline_label.setText(text)
+        self.display_images()
+    
+    def display_images(self):
+        # Метки перерисовываются, только если изображение действительно сменилось
+        self.original_label.set_image(self.original_image)
+        self.processed_label.set_image(self.processed_image)
+
+
+# Повышение резкости
+
+class SharpeningTab(QWidget):
+    """
+    Вкладка для повышения резкости изображений
+    """
+    def __init__(self, store=None):
+        super().__init__()
+        self.original_image = None
+        self.processed_image = None
+        self.store = store if store is not None else ImageStore()
+        self.proxy_image = None
+        self.proxy_factor = 1.0
+        # Буферы быстрых путей переиспользуются между запусками
+        self.sharpeners = {"float32": FastSharpener("float32"), "int16": FastSharpener("int16")}
+        # В режиме полос у каждого потока пула свои буферы
+        self.strip_local = threading.local()
+        # Состояние -- параметры резкости (None -- исходное изображение) и сжатый снимок
+        self.history = History()
+        self.pending_state = None
+        self.runner = TaskRunner(self)
+        self.runner.finished.connect(self.show_result)
+        self.initUI()
+        
+    def initUI(self):
+        main_layout = QHBoxLayout()
+        self.setLayout(main_layout)
+        
+        left_panel = QVBoxLayout()
+        
+        load_group = QGroupBox("Загрузка изображения")
+        load_layout = QVBoxLayout()
+        self.load_btn = QPushButton("Загрузить изображение")
+        self.load_btn.clicked.connect(self.load_image)
+        load_layout.addWidget(self.load_btn)
+        load_group.setLayout(load_layout)
+        left_panel.addWidget(load_group)
+        
+        params_group = QGroupBox("Параметры повышения резкости")
+        params_layout = QVBoxLayout()
+        
+        params_layout.addWidget(QLabel("Метод повышения резкости:"))
+        self.method_combo = QComboBox()
+        self.method_combo.addItems(["Лапласиан", "Лапласиан Гауссиана (LoG)"])
+        params_layout.addWidget(self.method_combo)
+        
+        params_layout.addWidget(QLabel("Размер ядра (ksize, нечетный):"))
+        self.ksize_spin = QSpinBox()
+        self.ksize_spin.setMinimum(1)
+        self.ksize_spin.setMaximum(31)
+        self.ksize_spin.setSingleStep(2)
+        self.ksize_spin.setValue(3)
+        params_layout.addWidget(self.ksize_spin)
+        
+        params_layout.addWidget(QLabel("Точность вычислений:"))
+        self.precision_combo = QComboBox()
+        self.precision_combo.addItems(["float64 (эталон)", "float32", "int16"])
+        params_layout.addWidget(self.precision_combo)
+        
+        self.live_check = QCheckBox("Живой просмотр (уменьшенная копия)")
+        params_layout.addWidget(self.live_check)
+        self.method_combo.currentIndexChanged.connect(self.live_preview)
+        self.ksize_spin.valueChanged.connect(self.live_preview)
+        self.precision_combo.currentIndexChanged.connect(self.live_preview)
+        
+        
+        self.apply_btn = QPushButton("Применить резкость")
+        self.apply_btn.clicked.connect(self.apply_sharpening) 
+        params_layout.addWidget(self.apply_btn)
+        
+        self.reset_btn = QPushButton("Сброс")
+        self.reset_btn.clicked.connect(self.reset_image)
+        params_layout.addWidget(self.reset_btn)
+        
+        history_layout = QHBoxLayout()
+        self.undo_btn = QPushButton("Отменить")
+        self.undo_btn.setShortcut("Ctrl+Z")
+        self.undo_btn.clicked.connect(self.undo)
+        history_layout.addWidget(self.undo_btn)
+        self.redo_btn = QPushButton("Повторить")
+        self.redo_btn.setShortcut("Ctrl+Shift+Z")
+        self.redo_btn.clicked.connect(self.redo)
+        history_layout.addWidget(self.redo_btn)
+        params_layout.addLayout(history_layout)
+        
+        self.history_label = QLabel()
+        params_layout.addWidget(self.history_label)
+        self.update_history_buttons()
+
+        params_group.setLayout(params_layout)
+        left_panel.addWidget(params_group)
+        
+        left_panel.addWidget(BusyIndicator(self.runner))
+        
+        left_panel.addStretch()
+        
+        right_panel = QVBoxLayout()
+        
+        self.original_label = PreviewLabel("Оригинальное изображение")
+        right_panel.addWidget(self.original_label)
+        
+        self.processed_label = PreviewLabel("Обработанное изображение")
+        right_panel.addWidget(self.processed_label)
+        
+        main_layout.addLayout(left_panel)
+        main_layout.addLayout(right_panel)
+        
+    def load_image(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Выберите изображение", "", 
+            "Images (*.png *.jpg *.jpeg *.bmp *.tiff)"
+        )
+        
+        if file_path:
+            try:
+                preview = self.store.preview(file_path)
+            except (OSError, ValueError):
+                return
+            self.original_image = None
+            self.proxy_image = None
+            self.history.clear()
+            self.update_history_buttons()
+            self.original_label.set_image(preview)
+            self.runner.submit(LOAD, self.store.load, file_path)
+    
+    def set_original(self, image):
+        # Результат до первой обработки -- сам исходный массив (только для чтения)
+        self.original_image = image
+        self.proxy_image, self.proxy_factor = make_proxy(image)
+        self.processed_image = image
+        self.history.push(None)
+        self.update_history_buttons()
+        self.display_images()
+                
+    def reset_image(self):
+        if self.original_image is not None:
+            self.runner.cancel()
+            self.processed_image = self.original_image
+            self.history.push(None)
+            self.update_history_buttons()
+            self.display_images()
+    
+    def undo(self):
+        self.restore(UNDO, self.history.undo())
+    
+    def redo(self):
+        self.restore(REDO, self.history.redo())
+    
+    def restore(self, name, entry):
+        """
+        Показывает результат записи истории: распаковывает снимок или,
+        если он вытеснен из-за бюджета памяти, пересчитывает по параметрам.
+        """
+        if entry is None:
+            return
+        self.update_history_buttons()
+        if entry.state is None:
+            self.runner.cancel()
+            self.processed_image = self.original_image
+            self.display_images()
+        elif entry.snapshot is not None:
+            self.runner.submit(name, entry.snapshot.image)
+        else:
+            method, ksize, precision = entry.state
+            self.runner.submit("%s (пересчет)" % name, self.sharpen_func(precision),
+                               self.original_image, method, ksize)
+    
+    def update_history_buttons(self):
+        self.undo_btn.setEnabled(self.history.can_undo)
+        self.redo_btn.setEnabled(self.history.can_redo)
+        self.history_label.setText("История: %d записей, снимки %.1f МБ" % (
+            len(self.history), self.history.nbytes / (1 << 20)))
+    
+    def apply_sharpening(self):
+        """Запускает выбранный метод повышения резкости (Лаплас или LoG) в фоне."""
+        if self.original_image is None:
+            return
+            
+        method = self.method_combo.currentText()
+        ksize = self.ksize_spin.value()
+        self.pending_state = (SHARPEN_NAMES[method], ksize, self.precision_combo.currentText())
+        self.runner.submit(method, self.sharpen_func(), self.original_image,
+                           SHARPEN_NAMES[method], ksize)
+    
+    def sharpen_func(self, precision=None):
+        """Эталон sharpen (float64) или быстрый путь выбранной точности."""
+        precision = precision or self.precision_combo.currentText()
+        if EXECUTION.mode == "strips":
+            return partial(self.sharpen_strips, precision)
+        return self.sharpeners.get(precision, sharpen)
+    
+    def sharpen_strips(self, precision, image, method, ksize, sigma=1.0):
+        """Резкость полосами в пуле потоков parallel_ops."""
+        def func(tile):
+            if precision not in self.sharpeners:
+                return sharpen(tile, method, ksize, sigma)
+            sharpeners = self.strip_local.__dict__.setdefault("sharpeners", {})
+            if precision not in sharpeners:
+                sharpeners[precision] = FastSharpener(precision)
+            return sharpeners[precision](tile, method, ksize, sigma)
+        return EXECUTION.run(func, image, Sharpen(method, ksize, sigma).halo)
+    
+    def live_preview(self):
+        """Резкость на уменьшенной копии с ядром и sigma в ее масштабе."""
+        if not self.live_check.isChecked() or self.proxy_image is None:
+            return
+        method = self.method_combo.currentText()
+        f = self.proxy_factor
+        self.runner.submit("%s: %s" % (PREVIEW, method), self.sharpen_func(), self.proxy_image,
+                           SHARPEN_NAMES[method], scale_kernel(self.ksize_spin.value(), f),
+                           1.0 * f)
+    
+    def show_result(self, name, image, compute_s, latency_s):
+        if name == LOAD:
+            self.set_original(image)
+            return
+        self.processed_image = image
+        if not name.startswith((PREVIEW, UNDO, REDO)):
+            self.history.push(self.pending_state, image)
+            self.update_history_buttons()
+        self.display_images()
+        
+    def display_images(self):
+        # Метки перерисовываются, только если изображение действительно сменилось
+        self.original_label.set_image(self.original_image)
+        self.processed_label.set_image(self.processed_image)
+
+# Видео
+
+class VideoTab(QWidget):
+    """
+    Вкладка видео: цепочка морфологии и резкость с параметрами соседних
+    вкладок применяются к каждому кадру конвейером video_ops.
+    """
+    frame_ready = pyqtSignal(object)
+    stream_done = pyqtSignal(str)
+
+    def __init__(self, morphology_tab, sharpening_tab):
+        super().__init__()
+        self.morphology_tab = morphology_tab
+        self.sharpening_tab = sharpening_tab
+        self.video_path = None
+        self.stats = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        # Кадр показан -- можно передавать следующий (не копим сигналы в очереди)
+        self.shown = threading.Event()
+        self.frame_ready.connect(self.show_frame, Qt.QueuedConnection)
+        self.stream_done.connect(self.finish, Qt.QueuedConnection)
+        self.timer = QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.update_stats)
+        self.initUI()
+
+    def initUI(self):
+        main_layout = QHBoxLayout()
+        self.setLayout(main_layout)
+
+        left_panel = QVBoxLayout()
+
+        load_group = QGroupBox("Загрузка видео")
+        load_layout = QVBoxLayout()
+        self.load_btn = QPushButton("Открыть видео")
+        self.load_btn.clicked.connect(self.load_video)
+        load_layout.addWidget(self.load_btn)
+        self.file_label = QLabel("Видео не выбрано")
+        self.file_label.setWordWrap(True)
+        load_layout.addWidget(self.file_label)
+        load_group.setLayout(load_layout)
+        left_panel.addWidget(load_group)
+
+        params_group = QGroupBox("Обработка кадров")
+        params_layout = QVBoxLayout()
+        self.morph_check = QCheckBox("Цепочка вкладки морфологии")
+        self.morph_check.setChecked(True)
+        params_layout.addWidget(self.morph_check)
+        self.sharpen_check = QCheckBox("Резкость с параметрами вкладки резкости")
+        params_layout.addWidget(self.sharpen_check)
+
+        params_layout.addWidget(QLabel("Рабочих потоков:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setMinimum(1)
+        self.workers_spin.setMaximum(32)
+        self.workers_spin.setValue(2)
+        params_layout.addWidget(self.workers_spin)
+
+        self.preview_btn = QPushButton("Просмотр (с пропуском кадров)")
+        self.preview_btn.clicked.connect(self.start_preview)
+        params_layout.addWidget(self.preview_btn)
+
+        self.export_btn = QPushButton("Экспорт в файл")
+        self.export_btn.clicked.connect(self.start_export)
+        params_layout.addWidget(self.export_btn)
+
+        self.stop_btn = QPushButton("Стоп")
+        self.stop_btn.clicked.connect(self.stop)
+        self.stop_btn.setEnabled(False)
+        params_layout.addWidget(self.stop_btn)
+        params_group.setLayout(params_layout)
+        left_panel.addWidget(params_group)
+
+        self.stats_label = QLabel("Готово")
+        self.stats_label.setWordWrap(True)
+        left_panel.addWidget(self.stats_label)
+
+        left_panel.addStretch()
+
+        self.frame_label = PreviewLabel("Кадр")
+        main_layout.addLayout(left_panel)
+        main_layout.addWidget(self.frame_label, 1)
+
+    def load_video(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Выберите видео", "", "Video (*.mp4 *.avi *.mkv *.mov)")
+        if file_path:
+            self.stop()
+            self.video_path = file_path
+            self.file_label.setText(file_path)
+
+    def steps(self):
+        """Шаги для кадров по параметрам вкладок морфологии и резкости."""
+        steps = list(self.morphology_tab.pipeline.steps) if self.morph_check.isChecked() else []
+        if self.sharpen_check.isChecked():
+            tab = self.sharpening_tab
+            steps.append(Sharpen(SHARPEN_NAMES[tab.method_combo.currentText()],
+                                 tab.ksize_spin.value()))
+        return steps
+
+    def start_preview(self):
+        """Просмотр в темпе источника: кадры, для которых нет места, отбрасываются."""
+        def sink(frame):
+            # Пока интерфейс не показал предыдущий кадр, конвейер ждет, а чтение отбрасывает
+            while not self.shown.wait(0.1):
+                if self.stop_event.is_set():
+                    return
+            self.shown.clear()
+            self.frame_ready.emit(frame)
+        self.start(sink, True)
+
+    def start_export(self):
+        """Экспорт без потерь; на экран попадают кадры, которые интерфейс успевает показать."""
+        if self.video_path is None:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить видео", "", "Video (*.mp4 *.avi *.mkv)")
+        if not file_path:
+            return
+        try:
+            writer = open_writer(file_path, self.video_path)
+        except ValueError as e:
+            self.stats_label.setText(str(e))
+            return
+
+        def sink(frame):
+            writer.write(frame)
+            if self.shown.is_set():
+                self.shown.clear()
+                self.frame_ready.emit(frame)
+        self.start(sink, False, writer.release)
+
+    def start(self, sink, realtime, cleanup=None):
+        if self.video_path is None or self.thread is not None:
+            if cleanup is not None:
+                cleanup()
+            return
+        steps = self.steps()
+        self.stop_event = threading.Event()
+        self.stats = StreamStats()
+        self.shown.set()
+
+        def run():
+            message = ""
+            try:
+                run_stream(self.video_path, steps, sink, self.workers_spin.value(), realtime,
+                           stop=self.stop_event, stats=self.stats)
+            except Exception as e:  # ошибка показывается в интерфейсе, а не теряется в потоке
+                message = str(e)
+            finally:
+                if cleanup is not None:
+                    cleanup()
+            self.stream_done.emit(message)
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        self.set_running(True)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def set_running(self, running):
+        for button in (self.preview_btn, self.export_btn, self.load_btn):
+            button.setEnabled(not running)
+        self.stop_btn.setEnabled(running)
+        if running:
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def show_frame(self, frame):
+        self.frame_label.set_image(frame)
+        self.shown.set()
+
+    def update_stats(self):
+        if self.stats is not None:
+            self.stats_label.setText(self.stats.summary())
+
+    def finish(self, message):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.set_running(False)
+        self.update_stats()
+        if message:
+            self.stats_label.setText("Ошибка: %s" % message)
+
+
+# Главное окно приложения
+
+class ImageProcessingApp(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.initUI()
+        
+    def initUI(self):
+        self.setWindowTitle('Обработка изображений: Морфология и Повышение Резкости')
+        self.setGeometry(100, 100, 1200, 800)
+        
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        
+        main_layout = QVBoxLayout()
+        central_widget.setLayout(main_layout)
+        
+        self.tabs = QTabWidget()
+        # Один файл, открытый в обеих вкладках, декодируется один раз
+        self.store = ImageStore()
+        self.morphology_tab = MorphologyTab(self.store)
+        self.sharpening_tab = SharpeningTab(self.store)
+        self.video_tab = VideoTab(self.morphology_tab, self.sharpening_tab)
+        
+        self.tabs.addTab(self.morphology_tab, "Морфологическая обработка")
+        self.tabs.addTab(self.sharpening_tab, "Повышение резкости")
+        self.tabs.addTab(self.video_tab, "Видео")
+        
+        main_layout.addWidget(self.tabs)
+        self.init_execution()
+        self.init_profiling()
+
+    def init_execution(self):
+        """Меню режима потоков: cv2.setNumThreads или полосы в пуле (parallel_ops)."""
+        menu = self.menuBar().addMenu("Выполнение")
+        self.mode_group = QActionGroup(self)
+        titles = {"cv2": "Потоки OpenCV (cv2.setNumThreads)", "strips": "Полосы в пуле потоков"}
+        for mode in EXEC_MODES:
+            action = QAction(titles[mode], self, checkable=True)
+            action.setData(mode)
+            action.setChecked(mode == EXECUTION.mode)
+            self.mode_group.addAction(action)
+            menu.addAction(action)
+        menu.addSeparator()
+        self.threads_group = QActionGroup(self)
+        cores = os.cpu_count() or 1
+        counts = sorted({n for n in (1, 2, 4, 8, 16, 32) if n < cores} | {cores})
+        for n in counts:
+            action = QAction("Потоков: %d" % n, self, checkable=True)
+            action.setData(n)
+            action.setChecked(n == EXECUTION.threads)
+            self.threads_group.addAction(action)
+            menu.addAction(action)
+        self.mode_group.triggered.connect(self.configure_execution)
+        self.threads_group.triggered.connect(self.configure_execution)
+
+    def configure_execution(self):
+        threads = self.threads_group.checkedAction()
+        EXECUTION.configure(self.mode_group.checkedAction().data(),
+                            threads.data() if threads is not None else None)
+
+    def init_profiling(self):
+        """Меню профилирования и сводка самых долгих стадий в строке состояния."""
+        menu = self.menuBar().addMenu("Профилирование")
+        self.profile_action = QAction("Включить", self, checkable=True)
+        self.profile_action.setChecked(PROFILER.enabled)
+        self.profile_action.toggled.connect(self.toggle_profiling)
+        menu.addAction(self.profile_action)
+        self.memory_action = QAction("Учитывать пик памяти (tracemalloc)", self, checkable=True)
+        self.memory_action.setChecked(PROFILER.memory)
+        self.memory_action.toggled.connect(self.toggle_profiling)
+        menu.addAction(self.memory_action)
+        menu.addSeparator()
+        menu.addAction("Сбросить", self.reset_profiling)
+        menu.addAction("Экспорт трассировки (Chrome)...", self.export_trace)
+
+        self.profile_label = QLabel()
+        self.statusBar().addPermanentWidget(self.profile_label, 1)
+        self.profile_timer = QTimer(self)
+        self.profile_timer.timeout.connect(self.update_profile_status)
+        self.profile_timer.start(1000)
+        self.update_profile_status()
+
+    def toggle_profiling(self):
+        PROFILER.disable()
+        if self.profile_action.isChecked():
+            PROFILER.enable(memory=self.memory_action.isChecked())
+        self.update_profile_status()
+
+    def reset_profiling(self):
+        PROFILER.reset()
+        self.update_profile_status()
+
+    def export_trace(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Экспорт трассировки", "lab2_trace.json", "Chrome trace (*.json)")
+        if file_path:
+            count = PROFILER.export_chrome_trace(file_path)
+            self.statusBar().showMessage("Записано интервалов: %d -> %s" % (count, file_path), 5000)
+
+    def update_profile_status(self):
+        if not PROFILER.enabled:
+            text = "Профилирование выключено"
+        else:
+            text = PROFILER.format_summary(limit=4, separator="; ") or "Профилирование: нет данных"
+        self.profile_label.setText(text)
+        self.profile_label.setToolTip(PROFILER.format_summary())
+
+
+def main():
+    app = QApplication(sys.argv)
+    window = ImageProcessingApp()
+    window.show()
+    
+    screen_geometry = QApplication.primaryScreen().availableGeometry()
+    window_geometry = window.frameGeometry()
+    window.move((screen_geometry.width() - window_geometry.width()) // 2,
+                 (screen_geometry.height() - window_geometry.height()) // 2)
+    
+    sys.exit(app.exec_())
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
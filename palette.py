@@ -0,0 +1,180 @@
+"""
+Поиск ближайшего цвета палитры и квантование изображений.
+
+PaletteIndex разбивает цветовое пространство (rgb или lab) на равномерную
+сетку. Для каждой ячейки заранее отбираются только те цвета палитры,
+которые могут оказаться ближайшими к какой-либо ее точке: цвет отбрасывается,
+если даже до ближайшей точки ячейки он дальше, чем другой цвет до самой
+дальней. Запрос сравнивает пиксель лишь с кандидатами своей ячейки, а не
+со всей палитрой.
+
+Пример:
+    python palette.py photo.jpg out.png --space lab --dither ordered
+"""
+import argparse
+
+import numpy as np
+
+from colour_engine import convert
+
+# Палитра окна лабораторной 1
+DEFAULT_PALETTE = ['#ffffff', '#000000', '#ff0000', '#00ff00', '#0000ff',
+                   '#ffff00', '#ff00ff', '#00ffff', '#808080', '#c08040']
+
+# Границы образа куба sRGB (с запасом); запросы вне них ищутся перебором
+_BOUNDS = {
+    'rgb': ((0.0, 0.0, 0.0), (255.0, 255.0, 255.0)),
+    'lab': ((0.0, -87.0, -108.0), (100.0, 99.0, 95.0)),
+}
+
+# Матрица Байера 8x8 для упорядоченного сглаживания, значения в [-0.5, 0.5)
+_BAYER = np.array([
+    [0, 32, 8, 40, 2, 34, 10, 42],
+    [48, 16, 56, 24, 50, 18, 58, 26],
+    [12, 44, 4, 36, 14, 46, 6, 38],
+    [60, 28, 52, 20, 62, 30, 54, 22],
+    [3, 35, 11, 43, 1, 33, 9, 41],
+    [51, 19, 59, 27, 49, 17, 57, 25],
+    [15, 47, 7, 39, 13, 45, 5, 37],
+    [63, 31, 55, 23, 61, 29, 53, 21],
+]) / 64.0 - 0.5
+
+
+def parse_colours(colours):
+    """Список HEX-строк или массив RGB -> массив RGB uint8 (N, 3)."""
+    if isinstance(colours, np.ndarray):
+        return colours.astype(np.uint8).reshape(-1, 3)
+    rgb = []
+    for value in colours:
+        if isinstance(value, str):
+            h = value.strip().lstrip('#')
+            if len(h) == 3:
+                h = ''.join(ch * 2 for ch in h)
+            rgb.append((int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16)))
+        else:
+            rgb.append(tuple(value))
+    return np.array(rgb, dtype=np.uint8)
+
+
+class PaletteIndex:
+    """Индекс ближайшего цвета палитры по евклидову расстоянию в space."""
+
+    def __init__(self, colours, space='lab', grid=16):
+        if space not in _BOUNDS:
+            raise ValueError('поддерживаются пространства: %s' % ', '.join(sorted(_BOUNDS)))
+        self.space = space
+        self.grid = grid
+        self.rgb = parse_colours(colours)
+        self.points = convert(self.rgb, 'rgb', space)
+        lo, hi = (np.array(b, dtype=np.float64) for b in _BOUNDS[space])
+        self._lo = lo
+        self._hi = hi
+        self._step = (hi - lo) / grid
+        self._build()
+
+    def _build(self, cells_per_step=1024):
+        """Кандидаты для каждой ячейки сетки."""
+        g = self.grid
+        idx = np.indices((g, g, g)).reshape(3, -1).T
+        p = self.points[None, :, :]
+        keep = np.empty((len(idx), len(self.points)), dtype=bool)
+        for start in range(0, len(idx), cells_per_step):
+            cell_lo = (self._lo + idx[start:start + cells_per_step] * self._step)[:, None, :]
+            cell_hi = cell_lo + self._step
+            # Расстояние до ближайшей и до самой дальней точки ячейки
+            d_min = ((p - np.clip(p, cell_lo, cell_hi)) ** 2).sum(axis=-1)
+            farthest = np.where(np.abs(p - cell_lo) > np.abs(p - cell_hi), cell_lo, cell_hi)
+            d_max = ((p - farthest) ** 2).sum(axis=-1)
+            keep[start:start + cells_per_step] = d_min <= d_max.min(axis=1, keepdims=True)
+
+        self.max_candidates = int(keep.sum(axis=1).max())
+        # Дополняем строки фиктивным цветом на бесконечности (индекс len(points))
+        sentinel = len(self.points)
+        cand = np.full((keep.shape[0], self.max_candidates), sentinel, dtype=np.intp)
+        order = np.argsort(~keep, axis=1, kind='stable')[:, :self.max_candidates]
+        valid = np.take_along_axis(keep, order, axis=1)
+        cand[valid] = order[valid]
+        self._candidates = cand
+        self._padded = np.vstack([self.points, np.full((1, 3), np.inf)])
+
+    def _nearest_points(self, pts):
+        """Индексы ближайших цветов для точек пространства (n, 3)."""
+        inside = ((pts >= self._lo) & (pts <= self._hi)).all(axis=1)
+        # Ячейки замкнуты: точка на верхней границе попадает в последнюю
+        cell = np.clip(np.floor((pts - self._lo) / self._step).astype(np.intp), 0, self.grid - 1)
+        result = np.empty(len(pts), dtype=np.intp)
+
+        c = cell[inside]
+        flat = (c[:, 0] * self.grid + c[:, 1]) * self.grid + c[:, 2]
+        cand = self._candidates[flat]
+        d = ((pts[inside, None, :] - self._padded[cand]) ** 2).sum(axis=-1)
+        result[inside] = np.take_along_axis(cand, d.argmin(axis=1)[:, None], axis=1)[:, 0]
+
+        if not inside.all():
+            outside = pts[~inside]
+            d = ((outside[:, None, :] - self.points[None, :, :]) ** 2).sum(axis=-1)
+            result[~inside] = d.argmin(axis=1)
+        return result
+
+    def nearest(self, rgb, chunk=1 << 16):
+        """RGB (..., 3) -> индексы ближайших цветов палитры (...)."""
+        a = np.asarray(rgb)
+        flat = a.reshape(-1, 3)
+        out = np.empty(flat.shape[0], dtype=np.intp)
+        for start in range(0, flat.shape[0], chunk):
+            pts = convert(flat[start:start + chunk], 'rgb', self.space)
+            out[start:start + chunk] = self._nearest_points(pts)
+        return out.reshape(a.shape[:-1])
+
+    def nearest_brute(self, rgb):
+        """Полный перебор палитры -- эталон для проверки индекса."""
+        pts = convert(np.asarray(rgb).reshape(-1, 3), 'rgb', self.space)
+        d = ((pts[:, None, :] - self.points[None, :, :]) ** 2).sum(axis=-1)
+        return d.argmin(axis=1).reshape(np.shape(rgb)[:-1])
+
+
+def quantize_image(rgb, index, dither='none', strength=None, chunk_rows=256):
+    """
+    Заменяет каждый пиксель изображения RGB (H, W, 3) ближайшим цветом палитры.
+    dither='ordered' добавляет перед поиском порог Байера 8x8 амплитудой
+    strength (по умолчанию -- средний шаг палитры по каналу).
+    """
+    h, w = rgb.shape[:2]
+    out = np.empty((h, w, 3), dtype=np.uint8)
+    if dither == 'ordered' and strength is None:
+        strength = 255.0 / max(1.0, round(len(index.rgb) ** (1 / 3)))
+    for start in range(0, h, chunk_rows):
+        band = rgb[start:start + chunk_rows].astype(np.float64)
+        if dither == 'ordered':
+            rows = np.arange(start, start + band.shape[0]) % 8
+            threshold = _BAYER[rows[:, None], (np.arange(w) % 8)[None, :]]
+            band = np.clip(band + threshold[..., None] * strength, 0, 255)
+        elif dither != 'none':
+            raise ValueError('неизвестный режим сглаживания: %r' % dither)
+        out[start:start + chunk_rows] = index.rgb[index.nearest(band)]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Квантование изображения по палитре')
+    parser.add_argument('image')
+    parser.add_argument('output')
+    parser.add_argument('--palette', default=','.join(DEFAULT_PALETTE),
+                        help='HEX-цвета через запятую (по умолчанию палитра лабораторной 1)')
+    parser.add_argument('--space', choices=sorted(_BOUNDS), default='lab')
+    parser.add_argument('--dither', choices=('none', 'ordered'), default='none')
+    parser.add_argument('--strength', type=float, default=None, help='амплитуда порога Байера')
+    parser.add_argument('--grid', type=int, default=16, help='ячеек сетки индекса по оси')
+    args = parser.parse_args()
+
+    import cv2
+    image = cv2.imread(args.image, cv2.IMREAD_COLOR)
+    if image is None:
+        parser.error('не удалось прочитать изображение: %s' % args.image)
+    index = PaletteIndex(args.palette.split(','), args.space, args.grid)
+    result = quantize_image(image[..., ::-1], index, args.dither, args.strength)
+    cv2.imwrite(args.output, result[..., ::-1])
+
+
+if __name__ == '__main__':
+    main()
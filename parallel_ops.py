@@ -0,0 +1,116 @@
+"""
+Управление потоками для операций cv2 лабораторной 2.
+
+Режим 'cv2' оставляет распараллеливание самой OpenCV, но число ее
+потоков задается явно (cv2.setNumThreads). В режиме 'strips' OpenCV
+работает в одном потоке, а кадр делится на полосы строк во всю ширину с
+полями (halo) по радиусу ядра; полосы считаются в пуле потоков Python
+(cv2 и numpy отпускают GIL), и внутренняя часть каждой пишется прямо в
+выходной массив. Так работа укладывается в заданное число ядер и не
+спорит с собственными пулами (видео, пакетная обработка), а ускорение
+от числа потоков можно измерить для каждой операции (bench_lab2.py
+--scaling).
+
+Полосы -- во всю ширину кадра, как тайлы tiled_ops: результат совпадает
+с обработкой целого кадра бит в бит.
+
+Начальные настройки задаются переменными окружения KG_LABS_EXEC (cv2 или
+strips) и KG_LABS_THREADS (число потоков, по умолчанию по числу ядер).
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from image_ops import PackedMask
+from profiler import span
+
+EXEC_MODES = ('cv2', 'strips')
+# Меньше строк в полосе -- поля съедают выигрыш
+MIN_STRIP_ROWS = 64
+
+
+def _rows(image):
+    """Массив, который делится по строкам: пиксели или слова упакованной маски."""
+    return image.words if isinstance(image, PackedMask) else image
+
+
+def _like(image, rows):
+    return PackedMask(rows, image.width, image.channels) if isinstance(image, PackedMask) else rows
+
+
+class Execution:
+    """
+    Режим выполнения и пул потоков для полос. Пока не вызван configure(),
+    потоки cv2 остаются как есть (по умолчанию OpenCV -- по числу ядер).
+    """
+
+    def __init__(self):
+        self.mode = 'cv2'
+        self.threads = cv2.getNumThreads()
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def configure(self, mode='cv2', threads=None):
+        """threads=None -- по числу ядер."""
+        if mode not in EXEC_MODES:
+            raise ValueError('неизвестный режим выполнения: %r' % mode)
+        threads = threads or os.cpu_count() or 1
+        with self._lock:
+            if self._pool is not None and (mode != 'strips' or threads != self.threads):
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            self.mode = mode
+            self.threads = threads
+            # В режиме полос потоки дает пул: внутренний параллелизм cv2 лишь мешал бы
+            cv2.setNumThreads(threads if mode == 'cv2' else 1)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix='strip')
+            return self._pool
+
+    def strip_count(self, height, halo):
+        """На сколько полос делить кадр высотой height (1 -- целиком)."""
+        if self.mode != 'strips':
+            return 1
+        return max(1, min(self.threads, height // max(MIN_STRIP_ROWS, 2 * halo)))
+
+    def run(self, func, image, halo):
+        """
+        func(image) по полосам с полями halo строк. func не должна менять
+        форму и тип данных; для PackedMask делятся строки слов.
+        """
+        rows = _rows(image)
+        h = rows.shape[0]
+        count = self.strip_count(h, halo)
+        if count == 1:
+            return func(image)
+        out = np.empty_like(rows)
+        bounds = [h * i // count for i in range(count + 1)]
+
+        def strip(start, stop):
+            top, bottom = max(0, start - halo), min(h, stop + halo)
+            with span('strip', rows=stop - start):
+                result = _rows(func(_like(image, rows[top:bottom])))
+                out[start:stop] = result[start - top:stop - top]
+
+        pool = self._executor()
+        jobs = [pool.submit(strip, start, stop) for start, stop in zip(bounds, bounds[1:])]
+        for job in jobs:
+            job.result()
+        return _like(image, out)
+
+    def apply(self, step, image):
+        """step.apply(image) с учетом режима; у шага должно быть свойство halo."""
+        return self.run(step.apply, image, step.halo)
+
+
+EXECUTION = Execution()
+
+if os.environ.get('KG_LABS_EXEC') or os.environ.get('KG_LABS_THREADS'):
+    EXECUTION.configure(os.environ.get('KG_LABS_EXEC', 'cv2'),
+                        int(os.environ.get('KG_LABS_THREADS', 0)) or None)
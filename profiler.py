@@ -0,0 +1,200 @@
+"""
+Профилирование операций лабораторной 2 по стадиям.
+
+Код размечается блоками with span('стадия'): декодирование, cvtColor,
+операция cv2, преобразования float, масштабирование для показа и т. д.
+Пока профилирование выключено, span() возвращает один и тот же пустой
+контекст -- это одна проверка флага на вызов, а вызовы идут на уровне
+целых операций над кадром, а не пикселей.
+
+Включенный профилировщик записывает интервалы (поток, начало,
+длительность) и копит по каждой стадии число вызовов, суммарное и
+максимальное время. С memory=True для каждой стадии запоминается и пик
+выделений (tracemalloc видит память numpy и cv2-массивов numpy); при
+одновременной работе нескольких потоков пик общий для процесса, поэтому
+приблизительный. Записи выгружаются в формат Chrome trace event (JSON
+для chrome://tracing и Perfetto).
+
+Переменная окружения KG_LABS_PROFILE=1 включает профилирование при
+импорте, KG_LABS_PROFILE=memory -- вместе с учетом памяти.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import nullcontext
+
+# Сколько последних интервалов хранится для трассировки
+MAX_EVENTS = 200000
+
+_NULL = nullcontext()
+
+
+class StageStats:
+    __slots__ = ('count', 'total', 'max', 'peak')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.peak = 0
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'args', 'start', 'base', 'peak', 'tracked')
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        profiler = self.profiler
+        # Учет памяти решается при входе: переключение профилировщика во
+        # время стадии не должно ломать ее выход и стек потока
+        self.tracked = profiler.memory and tracemalloc.is_tracing()
+        if self.tracked:
+            self.base = tracemalloc.get_traced_memory()[0]
+            self.peak = 0
+            stack = profiler._stack()
+            if stack:
+                # Сброс пика стер бы пик родителя: сохраняем его заранее
+                parent = stack[-1]
+                parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1] - parent.base)
+            stack.append(self)
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        profiler = self.profiler
+        peak = 0
+        if self.tracked:
+            # После остановки tracemalloc get_traced_memory() дает нули
+            peak = max(self.peak, tracemalloc.get_traced_memory()[1] - self.base)
+            stack = profiler._stack()
+            stack.pop()
+            if stack:
+                parent = stack[-1]
+                parent.peak = max(parent.peak, peak + self.base - parent.base)
+        profiler._record(self.name, self.start, end - self.start, peak, self.args)
+        return False
+
+
+class Profiler:
+    """Сборщик интервалов; обычно используется общий экземпляр PROFILER."""
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        # tracemalloc запущен этим профилировщиком (и им же будет остановлен)
+        self._tracing = False
+        self.stats = {}
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, memory=False):
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        self.memory = memory
+        if not memory:
+            self._stop_tracing()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.memory = False
+        self._stop_tracing()
+
+    def _stop_tracing(self):
+        if self._tracing:
+            self._tracing = False
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+            self.events.clear()
+            self.origin = time.perf_counter()
+
+    def span(self, name, **args):
+        """Контекст, измеряющий стадию name; args попадают в трассировку."""
+        if not self.enabled:
+            return _NULL
+        return _Span(self, name, args)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name, start, duration, peak, args):
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = StageStats()
+            stats.count += 1
+            stats.total += duration
+            stats.max = max(stats.max, duration)
+            stats.peak = max(stats.peak, peak)
+            self.events.append((name, threading.get_ident(), start, duration, peak, args))
+
+    def summary(self, limit=None):
+        """Стадии по убыванию суммарного времени: [(имя, StageStats), ...]."""
+        with self._lock:
+            items = sorted(self.stats.items(), key=lambda item: -item[1].total)
+        return items[:limit] if limit else items
+
+    def format_summary(self, limit=None, separator='\n'):
+        parts = []
+        for name, s in self.summary(limit):
+            text = '%s: %d x %.1f мс (макс. %.1f)' % (
+                name, s.count, s.total / s.count * 1000, s.max * 1000)
+            if self.memory:
+                text += ', пик %.1f МБ' % (s.peak / (1 << 20))
+            parts.append(text)
+        return separator.join(parts)
+
+    def export_chrome_trace(self, path):
+        """Пишет записанные интервалы в формате Chrome trace event; возвращает их число."""
+        with self._lock:
+            events = list(self.events)
+            origin = self.origin
+        pid = os.getpid()
+        trace = []
+        threads = {}
+        for name, tid, start, duration, peak, args in events:
+            threads.setdefault(tid, len(threads))
+            event = {
+                'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': pid,
+                'tid': threads[tid], 'ts': (start - origin) * 1e6, 'dur': duration * 1e6,
+            }
+            args = dict(args)
+            if peak:
+                args['peak_mb'] = round(peak / (1 << 20), 3)
+            if args:
+                event['args'] = {k: v if isinstance(v, (int, float, bool)) else str(v)
+                                 for k, v in args.items()}
+            trace.append(event)
+        for tid, index in threads.items():
+            trace.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': index,
+                          'args': {'name': 'поток %d' % tid}})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        return len(events)
+
+
+PROFILER = Profiler()
+span = PROFILER.span
+
+if os.environ.get('KG_LABS_PROFILE'):
+    PROFILER.enable(memory=os.environ['KG_LABS_PROFILE'] == 'memory')
@@ -0,0 +1,146 @@
+"""
+Фоновое выполнение операций лабораторной 2 в QThreadPool.
+
+TaskRunner выполняет задачи вкладки по одной в собственном пуле (cv2
+отпускает GIL, поэтому окно остается отзывчивым) и применяет правило
+«побеждает последний»: задачи, еще не начатые к приходу новых
+параметров, снимаются с очереди, а результаты устаревших задач
+отбрасываются. Сигналы доставляются в поток интерфейса.
+"""
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+from PyQt5.QtWidgets import QHBoxLayout, QLabel, QProgressBar, QWidget
+
+from profiler import span
+
+
+class _Task(QRunnable):
+    def __init__(self, runner, generation, name, func, args, kwargs):
+        super().__init__()
+        self.runner = runner
+        self.generation = generation
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.submitted = time.perf_counter()
+
+    def run(self):
+        if self.runner.is_stale(self.generation):
+            return
+        start = time.perf_counter()
+        try:
+            with span('task', task=self.name):
+                result = self.func(*self.args, **self.kwargs)
+        except Exception as e:  # ошибка показывается в интерфейсе, а не теряется в потоке
+            self.runner._failed.emit(self.generation, self.name, str(e))
+            return
+        self.runner._done.emit(self.generation, self.name, result,
+                               time.perf_counter() - start, time.perf_counter() - self.submitted)
+
+
+class TaskRunner(QObject):
+    """
+    Очередь «побеждает последний».
+
+    finished(name, result, compute_s, latency_s) -- результат актуальной
+    задачи; latency_s -- от постановки в очередь до готовности.
+    """
+    finished = pyqtSignal(str, object, float, float)
+    failed = pyqtSignal(str, str)
+    busy_changed = pyqtSignal(bool)
+
+    _done = pyqtSignal(int, str, object, float, float)
+    _failed = pyqtSignal(int, str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.generation = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._done.connect(self._deliver, Qt.QueuedConnection)
+        self._failed.connect(self._deliver_error, Qt.QueuedConnection)
+
+    def is_stale(self, generation):
+        return generation != self.generation
+
+    def submit(self, name, func, *args, cancellable=False):
+        """
+        Ставит func(*args) в очередь; возвращает номер поколения задачи.
+        С cancellable=True функции передается cancelled() -- признак того,
+        что пришли новые параметры и работу можно прервать.
+        """
+        self.generation += 1
+        generation = self.generation
+        self.pool.clear()
+        if self.delivered != generation - 1:
+            self.dropped += 1
+        kwargs = {'cancelled': lambda: self.is_stale(generation)} if cancellable else {}
+        self.pool.start(_Task(self, generation, name, func, args, kwargs))
+        self.busy_changed.emit(True)
+        return self.generation
+
+    def cancel(self):
+        """Отменяет все задачи: их результаты больше не будут доставлены."""
+        self.generation += 1
+        self.delivered = self.generation
+        self.pool.clear()
+        self.busy_changed.emit(False)
+
+    @property
+    def busy(self):
+        return self.delivered != self.generation
+
+    def _deliver(self, generation, name, result, compute_s, latency_s):
+        if self.is_stale(generation) or result is None:
+            return
+        self.delivered = generation
+        self.busy_changed.emit(False)
+        self.finished.emit(name, result, compute_s, latency_s)
+
+    def _deliver_error(self, generation, name, message):
+        if self.is_stale(generation):
+            return
+        self.delivered = generation
+        self.busy_changed.emit(False)
+        self.failed.emit(name, message)
+
+
+class BusyIndicator(QWidget):
+    """Бегущий индикатор занятости и строка с задержкой последней операции."""
+
+    def __init__(self, runner, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 0)
+        self.progress.setMaximumWidth(60)
+        self.progress.setVisible(False)
+        layout.addWidget(self.progress)
+
+        self.label = QLabel("Готово")
+        self.label.setWordWrap(True)
+        layout.addWidget(self.label, 1)
+
+        self.runner = runner
+        runner.busy_changed.connect(self.set_busy)
+        runner.finished.connect(self.report)
+        runner.failed.connect(self.report_error)
+
+    def set_busy(self, busy):
+        self.progress.setVisible(busy)
+        if busy:
+            self.label.setText("Выполняется...")
+
+    def report(self, name, result, compute_s, latency_s):
+        self.label.setText("%s: %.0f мс (вычисление %.0f мс), отброшено запросов: %d" % (
+            name, latency_s * 1000, compute_s * 1000, self.runner.dropped))
+
+    def report_error(self, name, message):
+        self.label.setText("%s: ошибка: %s" % (name, message))
@@ -0,0 +1,193 @@
+"""
+Обработка очень больших изображений тайлами (морфология и резкость).
+
+Источник открывается через memory map, каждый тайл читается с полями
+(halo), ширина которых равна радиусу влияния всей цепочки шагов, и
+после обработки его внутренняя часть записывается прямо в выходной
+файл. Пиковая память определяется размером тайла, а тайлы
+распределяются по процессам.
+
+Тайл -- полоса строк во всю ширину кадра: векторизованные фильтры cv2
+считают «хвост» строки иначе, чем ее начало, поэтому float-результат
+резкости совпадает с обработкой всего кадра бит в бит, только если
+ширина строки та же.
+
+Вход без распаковки (.npy (H, W) или (H, W, 3), двоичный PPM P6)
+открывается напрямую, остальные форматы один раз декодируются во
+временный .npy; на этом шаге кадр целиком находится в памяти (см.
+colour_separation). Выход -- .npy или .ppm. Как и в colour_separation,
+цветные .npy хранятся в порядке RGB.
+
+Пример:
+    python tiled_ops.py scan.ppm out.ppm erode:rect:5:2 sharpen:log:5 --workers 4
+"""
+import argparse
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from colour_separation import BAND_PIXELS, open_rgb, _read_ppm_header, _spill_to_npy
+from image_ops import SHARPEN_METHODS, sharpen
+from morph_pipeline import parse_step
+
+_Sharpen = namedtuple('Sharpen', 'method ksize sigma alpha')
+
+
+class Sharpen(_Sharpen):
+    """Шаг повышения резкости с интерфейсом шага морфологической цепочки."""
+    __slots__ = ()
+
+    def __new__(cls, method='laplacian', ksize=3, sigma=1.0, alpha=1.0):
+        if method not in SHARPEN_METHODS:
+            raise ValueError('неизвестный метод: %r' % method)
+        return super().__new__(cls, method, int(ksize), float(sigma), float(alpha))
+
+    def apply(self, image):
+        return sharpen(image, self.method, self.ksize, self.sigma, self.alpha)
+
+    @property
+    def halo(self):
+        if self.method == 'laplacian':
+            return max(1, self.ksize // 2)
+        blur_ksize = self.ksize if self.ksize % 2 != 0 else self.ksize + 1
+        return max(3, blur_ksize) // 2 + 1
+
+
+def parse_tiled_step(text):
+    """'sharpen:method:ksize' или шаг морфологии 'op:shape:size[:iterations]'."""
+    parts = text.split(':')
+    if parts[0] == 'sharpen':
+        if len(parts) > 3:
+            raise ValueError('ожидается sharpen:method:ksize: %r' % text)
+        return Sharpen(parts[1] if len(parts) > 1 else 'laplacian',
+                       int(parts[2]) if len(parts) > 2 else 3)
+    return parse_step(text)
+
+
+def open_image(path):
+    """Изображение uint8 (H, W) или (H, W, 3) через memory map; None для сжатых форматов."""
+    if os.path.splitext(path)[1].lower() == '.npy':
+        image = np.load(path, mmap_mode='r')
+        if image.dtype != np.uint8 or not (image.ndim == 2 or image.shape[2:] == (3,)):
+            raise ValueError('ожидается .npy uint8 формы (H, W) или (H, W, 3): %s' % path)
+        return image
+    return open_rgb(path)
+
+
+def check_output(path, shape):
+    """ValueError, если результат формы shape нельзя записать в path."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in ('.npy', '.ppm', '.pnm'):
+        raise ValueError('выход поддерживается в .npy или .ppm: %s' % path)
+    if ext != '.npy' and len(shape) != 3:
+        raise ValueError('PPM поддерживает только цветные изображения: %s' % path)
+
+
+def create_output(path, shape):
+    """Создает выходной файл нужного размера и возвращает его memmap."""
+    check_output(path, shape)
+    if os.path.splitext(path)[1].lower() == '.npy':
+        return np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=shape)
+    header = b'P6\n%d %d\n255\n' % (shape[1], shape[0])
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.truncate(len(header) + int(np.prod(shape)))
+    return np.memmap(path, dtype=np.uint8, mode='r+', offset=len(header), shape=shape)
+
+
+def _open_output(path):
+    if os.path.splitext(path)[1].lower() == '.npy':
+        return np.load(path, mmap_mode='r+')
+    w, h, offset = _read_ppm_header(path)
+    return np.memmap(path, dtype=np.uint8, mode='r+', offset=offset, shape=(h, w, 3))
+
+
+def process_tile(image, out, steps, halo, start, stop):
+    """Обрабатывает строки start:stop с полями halo и пишет их в out."""
+    top = max(0, start - halo)
+    tile = np.array(image[top:min(image.shape[0], stop + halo)])
+    if tile.ndim == 3:
+        tile = tile[..., ::-1]  # операции cv2 ожидают BGR
+    for step in steps:
+        tile = step.apply(tile)
+    core = tile[start - top:stop - top]
+    out[start:stop] = core[..., ::-1] if core.ndim == 3 else core
+
+
+def _tile_worker(src, dst, steps, halo, start, stop):
+    """Тайл в отдельном процессе: источник и выход открываются заново по путям."""
+    out = _open_output(dst)
+    process_tile(open_image(src), out, steps, halo, start, stop)
+    out.flush()
+    return stop - start
+
+
+def run_tiled(path, out_path, steps, tile_rows=None, workers=None):
+    """Применяет цепочку steps к изображению path тайлами и пишет результат в out_path."""
+    halo = sum(step.halo for step in steps)
+    src = path
+    spill = None
+    image = open_image(path)
+    if image is None:
+        spill = os.path.splitext(out_path)[0] + '.src.npy'
+        _spill_to_npy(path, spill)
+        src = spill
+        image = open_image(spill)
+    shape = image.shape
+    del image
+    create_output(out_path, shape).flush()
+
+    h, w = shape[:2]
+    tile_rows = tile_rows or max(1, BAND_PIXELS // max(w, 1))
+    bands = [(start, min(start + tile_rows, h)) for start in range(0, h, tile_rows)]
+    try:
+        if workers == 1:
+            image, out = open_image(src), _open_output(out_path)
+            for start, stop in bands:
+                process_tile(image, out, steps, halo, start, stop)
+            out.flush()
+        else:
+            # Пул процессов нужен только здесь: импорт multiprocessing не замедляет
+            # модули, которые используют лишь однопроцессные функции
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(workers) as pool:
+                jobs = [pool.submit(_tile_worker, src, out_path, steps, halo, start, stop)
+                        for start, stop in bands]
+                for job in jobs:
+                    job.result()
+    finally:
+        if spill is not None:
+            os.remove(spill)
+    return len(bands)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Морфология и резкость больших изображений тайлами')
+    parser.add_argument('image', help='изображение (.npy, .ppm или любой формат cv2; сжатые '
+                                      'форматы декодируются в память целиком)')
+    parser.add_argument('output', help='результат (.npy или .ppm)')
+    parser.add_argument('steps', nargs='+',
+                        help='шаги op:shape:size[:iterations] или sharpen:method:ksize')
+    parser.add_argument('--tile-rows', type=int, default=None, help='строк в тайле без полей')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='число процессов (по умолчанию по числу ядер, 1 - без пула)')
+    args = parser.parse_args()
+
+    try:
+        steps = [parse_tiled_step(s) for s in args.steps]
+        image = open_image(args.image)
+        # Сжатые форматы декодируются в цветное изображение
+        check_output(args.output, (0, 0, 3) if image is None else image.shape)
+        del image
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    start = time.perf_counter()
+    count = run_tiled(args.image, args.output, steps, args.tile_rows, args.workers)
+    print('%d тайлов, поле %d пикс., %.2f с' % (
+        count, sum(s.halo for s in steps), time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Морфология и резкость для видео: конвейер кадров с ограниченной очередью.
+
+Поток чтения декодирует кадры cv2.VideoCapture, несколько рабочих
+потоков применяют цепочку шагов (cv2 отпускает GIL), а вызывающий поток
+получает кадры в исходном порядке и передает их приемнику (запись
+cv2.VideoWriter или показ). Одновременно в работе не больше depth
+кадров.
+
+В режиме реального времени (просмотр) кадры читаются с частотой
+источника, и если все места заняты, новый кадр отбрасывается. В режиме
+экспорта чтение ждет свободного места, поэтому ни один кадр не теряется.
+
+Статистика: достигнутая частота кадров, отброшенные кадры и средняя
+задержка стадий -- чтение, ожидание в очереди, обработка, вывод и весь
+путь кадра от чтения до вывода.
+
+Примеры:
+    python video_ops.py clip.mp4 out.mp4 erode:rect:5 sharpen:log:5 -w 4
+    python video_ops.py clip.mp4 --realtime --recipe recipe.json
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from tiled_ops import parse_tiled_step
+
+STAGES = ('read', 'queue', 'process', 'output', 'total')
+STAGE_TITLES = {
+    'read': 'чтение',
+    'queue': 'очередь',
+    'process': 'обработка',
+    'output': 'вывод',
+    'total': 'весь путь',
+}
+# Кодек по расширению выходного файла
+FOURCC = {'.mp4': 'mp4v', '.avi': 'MJPG', '.mkv': 'XVID'}
+
+
+class StreamStats:
+    """Счетчики потока; задержки -- средние по выведенным кадрам, секунды."""
+
+    def __init__(self):
+        self.frames = 0
+        self.dropped = 0
+        self.start = time.perf_counter()
+        self.totals = dict.fromkeys(STAGES, 0.0)
+
+    def add(self, timings):
+        self.frames += 1
+        for stage in STAGES:
+            self.totals[stage] += timings[stage]
+
+    @property
+    def fps(self):
+        elapsed = time.perf_counter() - self.start
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def latency(self, stage):
+        return self.totals[stage] / self.frames if self.frames else 0.0
+
+    def summary(self):
+        stages = ', '.join('%s %.1f' % (STAGE_TITLES[s], self.latency(s) * 1000) for s in STAGES)
+        return '%.1f кадр/с, кадров %d, отброшено %d; задержка, мс: %s' % (
+            self.fps, self.frames, self.dropped, stages)
+
+
+def run_stream(path, steps, sink, workers=None, realtime=False, depth=None, stop=None,
+               stats=None):
+    """
+    Применяет steps к кадрам видео path и вызывает sink(frame) для каждого
+    результата по порядку в текущем потоке. stop -- threading.Event для
+    досрочной остановки. Возвращает StreamStats.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError('не удалось открыть видео: %s' % path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    workers = workers or os.cpu_count() or 1
+    depth = depth or 2 * workers
+    slots = threading.Semaphore(depth)
+    tasks = queue.Queue()
+    results = queue.Queue()
+    stop = stop or threading.Event()
+    stats = stats or StreamStats()
+
+    def produce():
+        seq = 0
+        index = 0
+        start = time.perf_counter()
+        try:
+            while not stop.is_set():
+                if realtime:
+                    delay = start + index / fps - time.perf_counter()
+                    if delay > 0 and stop.wait(delay):
+                        break
+                t0 = time.perf_counter()
+                ok, frame = capture.read()
+                t1 = time.perf_counter()
+                if not ok:
+                    break
+                index += 1
+                if realtime:
+                    if not slots.acquire(blocking=False):
+                        stats.dropped += 1
+                        continue
+                else:
+                    while not slots.acquire(timeout=0.1):
+                        if stop.is_set():
+                            return
+                tasks.put((seq, frame, {'read': t1 - t0, 'start': t0, 'queued': t1}))
+                seq += 1
+        finally:
+            capture.release()
+            for _ in range(workers):
+                tasks.put(None)
+
+    def work():
+        while True:
+            item = tasks.get()
+            if item is None:
+                results.put(None)
+                return
+            seq, frame, timings = item
+            t0 = time.perf_counter()
+            timings['queue'] = t0 - timings.pop('queued')
+            try:
+                for step in steps:
+                    frame = step.apply(frame)
+            except Exception as e:  # ошибка передается в вызывающий поток
+                frame = e
+            timings['process'] = time.perf_counter() - t0
+            results.put((seq, frame, timings))
+
+    threads = [threading.Thread(target=produce, daemon=True)]
+    threads += [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    # Рабочие завершают кадры вразнобой: выводим строго по номерам
+    pending = {}
+    next_seq = 0
+    finished = 0
+    try:
+        while finished < workers:
+            item = results.get()
+            if item is None:
+                finished += 1
+                continue
+            seq, frame, timings = item
+            pending[seq] = (frame, timings)
+            while next_seq in pending:
+                frame, timings = pending.pop(next_seq)
+                next_seq += 1
+                if isinstance(frame, Exception):
+                    raise frame
+                t0 = time.perf_counter()
+                sink(frame)
+                t1 = time.perf_counter()
+                timings['output'] = t1 - t0
+                timings['total'] = t1 - timings.pop('start')
+                stats.add(timings)
+                slots.release()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return stats
+
+
+def open_writer(path, capture_path):
+    """cv2.VideoWriter с частотой и размером кадров исходного видео."""
+    capture = cv2.VideoCapture(capture_path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    capture.release()
+    fourcc = FOURCC.get(os.path.splitext(path)[1].lower(), 'mp4v')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    if not writer.isOpened():
+        raise ValueError('не удалось создать видео: %s' % path)
+    return writer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Морфология и резкость для видео')
+    parser.add_argument('video', help='исходное видео')
+    parser.add_argument('output', nargs='?', help='результат (.mp4, .avi, .mkv)')
+    parser.add_argument('steps', nargs='*',
+                        help='шаги op:shape:size[:iterations] или sharpen:method:ksize')
+    parser.add_argument('-r', '--recipe', help='файл рецепта JSON (как в batch_lab2)')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='рабочих потоков (по умолчанию по числу ядер)')
+    parser.add_argument('--depth', type=int, default=None, help='кадров в работе одновременно')
+    parser.add_argument('--realtime', action='store_true',
+                        help='читать с частотой источника и отбрасывать кадры при перегрузке')
+    args = parser.parse_args()
+
+    # Без выходного файла первый позиционный аргумент -- уже шаг
+    if args.output and ':' in args.output and not os.path.splitext(args.output)[1]:
+        args.steps.insert(0, args.output)
+        args.output = None
+    if args.realtime and args.output:
+        parser.error('в режиме --realtime кадры отбрасываются; запись возможна только без него')
+    try:
+        if args.recipe:
+            from batch_lab2 import load_recipe
+            steps = load_recipe(args.recipe)
+        else:
+            steps = [parse_tiled_step(s) for s in args.steps]
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    writer = open_writer(args.output, args.video) if args.output else None
+    sink = writer.write if writer is not None else (lambda frame: None)
+    try:
+        stats = run_stream(args.video, steps, sink, args.workers, args.realtime, args.depth)
+    finally:
+        if writer is not None:
+            writer.release()
+    print(stats.summary())
+
+
+if __name__ == '__main__':
+    main()